@@ -1,4 +1,18 @@
+from typing import TYPE_CHECKING
+
 __version__ = '0.1.0'
 __author__ = 'Sebastian Schmitt'
 
-from .board.screen import Game
+__all__ = ['Game']
+
+if TYPE_CHECKING:
+    from .board.screen import Game
+
+
+def __getattr__(name: str):
+    # - the GUI pulls in pygame, it is only imported on first use of Game so that the engine,
+    #   the players and the match runner import without it
+    if name == 'Game':
+        from .board.screen import Game
+        return Game
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,368 @@
+from .players.player import BasePlayer, TheFish
+from .players.player_minimax import PlayerMiniMax
+from .players.timing import TimeManager
+from .players.transposition import encode_move, decode_move
+from concurrent.futures import ProcessPoolExecutor, Future
+from argparse import ArgumentParser
+from collections import deque
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Iterator
+from chess import engine
+import multiprocessing as mp
+import numpy as np
+import logging
+import math
+import os
+import chess
+import chess.pgn
+
+
+# - mates are written as this many centipawns when the distance to mate is not known
+MATE_CP: int = 100_000
+
+# - the columns of the compact output, one entry per analysed position
+COLUMNS: dict[str, np.dtype] = {
+    'offset': np.dtype('<i8'),  # - byte offset of the game in the pgn file
+    'ply': np.dtype('<u2'),
+    'score': np.dtype('<f4'),  # - pawns from white's point of view
+    'move': np.dtype('<u2'),  # - best move, see transposition.encode_move
+    'depth': np.dtype('<u1'),
+}
+
+
+@dataclass
+class GameAnalysis:
+    """ evaluations of the positions of one game, from the starting position to the last move """
+    offset: int
+    pgn: str = ''
+    scores: list[float] = field(default_factory=list)
+    moves: list[chess.Move | None] = field(default_factory=list)
+    depths: list[int] = field(default_factory=list)
+
+
+class _ByteLines:
+    """ the lines of a pgn file opened in binary mode, for chess.pgn which only calls readline. Every 
+    line is read and decoded on its own, so tell() is a byte offset of the file that any reader can 
+    seek to, unlike the opaque positions text mode files give out """
+    def __init__(self, handle: BinaryIO) -> None:
+        self.handle: BinaryIO = handle
+        return None
+
+    def readline(self) -> str:
+        return self.handle.readline().decode('utf-8', errors='replace')
+
+    def tell(self) -> int:
+        return self.handle.tell()
+
+    def seek(self, offset: int) -> int:
+        return self.handle.seek(offset)
+
+    def close(self) -> None:
+        self.handle.close()
+        return None
+
+
+def scan_games(handle: BinaryIO, accept: Callable[[chess.pgn.Headers], bool] | None = None
+               ) -> Iterator[tuple[int, int, chess.pgn.Headers]]:
+    """ the games of an open pgn file with their start and end byte offsets, only the headers are parsed 
+    and the moves are skipped, so the file is scanned at constant memory whatever its size
+    Takes:
+        - handle: (BinaryIO) the pgn file opened in binary mode, positioned at the first game to scan
+        - accept: (optional callable) games whose headers it returns False for are skipped
+    """
+    lines: _ByteLines = _ByteLines(handle)
+    while True:
+        start: int = lines.tell()
+        headers: chess.pgn.Headers | None = chess.pgn.read_headers(lines)  # type: ignore[arg-type]
+        if headers is None:
+            return None
+        if accept is None or accept(headers):
+            yield start, lines.tell(), headers
+
+
+def evaluate(player: BasePlayer, state: chess.Board, depth: int | None = None,
+             movetime: int | None = None) -> tuple[float, chess.Move | None, int]:
+    """ score in pawns from white's point of view, best move and depth reached of a position. Players
+    without a score of their own, i.e. neither PlayerMiniMax nor TheFish, only give the move.
+    Takes:
+        - player: (BasePlayer) the player that searches the position
+        - state: (chess.Board) the position
+        - depth: (optional int) the deepest iteration of the search
+        - movetime: (optional int) the thinking time in milliseconds, unlimited if None
+    At least one of depth and movetime has to be given.
+    """
+    if depth is None and movetime is None:
+        raise ValueError('The search needs a depth or a movetime to stop at')
+    outcome: chess.Outcome | None = state.outcome()
+    if outcome is not None:
+        if outcome.winner is None:
+            return 0., None, 0
+        return math.inf if outcome.winner else -math.inf, None, 0
+    if isinstance(player, TheFish):
+        limit = engine.Limit(time=None if movetime is None else movetime / 1000, depth=depth)
+        result: engine.PlayResult = player.fish.play(state, limit, info=engine.INFO_SCORE)
+        score: engine.PovScore | None = result.info.get('score')
+        return (math.nan if score is None else score.white().score(mate_score=MATE_CP) / 100,
+                result.move, result.info.get('depth', 0))
+    if isinstance(player, PlayerMiniMax):
+        # - book and tablebase moves are not searched, stats of the previous position must not be reported for them
+        player.last_stats = None
+    # - the longest clock keeps depth only searches unlimited
+    move: chess.Move | None = (player.choose_move(state, 2 ** 31 if movetime is None else movetime, depth, move_fraction=1.)
+                               if isinstance(player, PlayerMiniMax) else player.choose_move(state, movetime or 2 ** 31))
+    stats = getattr(player, 'last_stats', None)
+    if stats is None or not stats.iterations:
+        return math.nan, move, 0
+    last = stats.iterations[-1]
+    return last.score if state.turn else -last.score, move, last.depth
+
+
+def pov_score(score: float) -> engine.PovScore:
+    """ the score in pawns from white's point of view as used in pgn comments, mates become MATE_CP """
+    return engine.PovScore(engine.Cp(round(max(-MATE_CP, min(MATE_CP, 100 * score)))), chess.WHITE)
+
+
+# - the pgn file and the player of a worker process, set up once by _init_worker
+_WORKER: tuple[_ByteLines, BasePlayer] | None = None
+
+
+def _init_worker(path: str, player: type[BasePlayer], player_args: dict, movetime: int | None) -> None:
+    global _WORKER
+    player_args = dict(player_args)
+    if issubclass(player, PlayerMiniMax) and movetime is not None:
+        # - the whole clock is the budget, so that every position gets movetime
+        player_args.setdefault('timer', TimeManager(moves_to_go=1, min_moves_to_go=1, overhead=0))
+    if issubclass(player, PlayerMiniMax):
+        player_args['stats'] = True
+    _WORKER = (_ByteLines(open(path, 'rb')), player(**player_args))
+    return None
+
+
+def _close_worker() -> None:
+    global _WORKER
+    if _WORKER is None:
+        return None
+    handle, player = _WORKER
+    handle.close()
+    if hasattr(player, 'close'):
+        player.close()
+    _WORKER = None
+    return None
+
+
+def analyse_game(offset: int, depth: int | None = None, movetime: int | None = None) -> GameAnalysis:
+    """ evaluate every position of the mainline of the game at offset in the pgn file of the worker.
+    The evaluations are added to the pgn as [%eval] comments and best moves that differ from
+    the move played as variations. """
+    if _WORKER is None:
+        raise RuntimeError('analyse_game is only called in a worker set up by _init_worker')
+    handle, player = _WORKER
+    handle.seek(offset)
+    game: chess.pgn.Game | None = chess.pgn.read_game(handle)  # type: ignore[arg-type]
+    analysis = GameAnalysis(offset)
+    if game is None:
+        return analysis
+    board: chess.Board = game.board()
+    node: chess.pgn.GameNode = game
+    while True:
+        score, best, reached = evaluate(player, board, depth, movetime)
+        analysis.scores.append(score)
+        analysis.moves.append(best)
+        analysis.depths.append(reached)
+        if not math.isnan(score):
+            node.set_eval(pov_score(score), reached or None)
+        following: chess.pgn.ChildNode | None = node.next()
+        if following is None:
+            break
+        if best is not None and best != following.move:
+            node.add_variation(best)
+        board.push(following.move)
+        node = following
+    analysis.pgn = str(game)
+    return analysis
+
+
+class ColumnWriter:
+    """ appends the analysed positions to one flat binary file per column in a directory,
+    read them back with read_columns """
+    def __init__(self, path: str, append: bool = False) -> None:
+        """ Initialiser of the ColumnWriter
+        Takes:
+            - path: (str) the directory of the column files
+            - append: (bool) add to existing columns instead of starting new ones
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path: str = path
+        self._files: dict[str, BinaryIO] = {name: open(os.path.join(path, f'{name}.bin'), 'ab' if append else 'wb')
+                                          for name in COLUMNS}
+        return None
+
+    def write(self, analysis: GameAnalysis) -> None:
+        n: int = len(analysis.scores)
+        columns: dict[str, np.ndarray] = {
+            'offset': np.full(n, analysis.offset), 'ply': np.arange(n), 'score': np.array(analysis.scores),
+            'move': np.array([encode_move(move) for move in analysis.moves]), 'depth': np.array(analysis.depths),
+        }
+        for name, values in columns.items():
+            self._files[name].write(values.astype(COLUMNS[name]).tobytes())
+        return None
+
+    def flush(self) -> None:
+        for handle in self._files.values():
+            handle.flush()
+        return None
+
+    def close(self) -> None:
+        for handle in self._files.values():
+            handle.close()
+        return None
+
+
+def read_columns(path: str) -> dict[str, np.ndarray]:
+    """ the columns written by a ColumnWriter, memory mapped so that they are only read when used """
+    columns: dict[str, np.ndarray] = {}
+    for name, dtype in COLUMNS.items():
+        file: str = os.path.join(path, f'{name}.bin')
+        empty: bool = not os.path.exists(file) or not os.path.getsize(file)
+        columns[name] = np.empty(0, dtype) if empty else np.memmap(file, dtype=dtype, mode='r')
+    return columns
+
+
+def best_moves(columns: dict[str, np.ndarray]) -> list[chess.Move | None]:
+    """ decode the move column of read_columns """
+    return [decode_move(int(code)) for code in columns['move']]
+
+
+def analyse_pgn(path: str, output: str, *, player: type[BasePlayer] = PlayerMiniMax, player_args: dict | None = None,
+                depth: int | None = None, movetime: int | None = 100, n_workers: int = 1, max_in_flight: int | None = None,
+                accept: Callable[[chess.pgn.Headers], bool] | None = None, columns: bool | None = None,
+                start_offset: int | None = None, max_games: int | None = None) -> int:
+    """ analyse the games of a pgn file of any size one by one. Only the headers are read in this process,
+    the games that pass accept are analysed by a pool of worker processes and written to output in
+    the order of the file. After every game the offset of the next one is written to <output>.offset,
+    a later call with the same output resumes from there. Returns the number of games analysed.
+    Takes:
+        - path: (str) the pgn file
+        - output: (str) an annotated pgn file, or a directory of column files, see ColumnWriter
+        - player: (PlayerType) the class of the player to evaluate with, PlayerMiniMax or TheFish
+        - player_args: (optional dict) extra arguments to give to the player
+        - depth: (optional int) the deepest iteration per position
+        - movetime: (optional int) the thinking time per position in milliseconds, None for depth only
+        - n_workers: (int) the number of processes analysing games at the same time
+        - max_in_flight: (optional int) the most games submitted and not yet written, defaults to
+                         twice n_workers, bounds the memory of the results waiting to be written
+        - accept: (optional callable) only games whose headers it returns True for are analysed
+        - columns: (optional bool) write columns instead of pgn, by default columns are written
+                   unless output ends with .pgn
+        - start_offset: (optional int) the byte offset in the pgn file to start at, by default where
+                        the last call with this output stopped or at the beginning. Outputs are
+                        appended to when starting anywhere but the beginning.
+        - max_games: (optional int) stop after this many games
+    """
+    if depth is None and movetime is None:
+        raise ValueError('The search needs a depth or a movetime to stop at')
+    logger = logging.getLogger(__name__)
+    columns = not output.endswith('.pgn') if columns is None else columns
+    checkpoint: str = f'{output}.offset'
+    if start_offset is None and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            start_offset = int(f.read().strip() or 0)
+        logger.info(f'Resuming {path} at offset {start_offset}')
+    start_offset = start_offset or 0
+    writer = ColumnWriter(output, append=start_offset > 0) if columns else open(output, 'a' if start_offset else 'w')
+    games: int = 0
+    try:
+        with open(path, 'rb') as handle:
+            handle.seek(start_offset)
+            jobs: Iterator[tuple[int, int]] = ((start, end) for start, end, _ in scan_games(handle, accept))
+            for analysis, end in _analyse_games(path, jobs, player, player_args or {}, depth, movetime,
+                                                n_workers, max_in_flight or 2 * n_workers, max_games):
+                if columns:
+                    writer.write(analysis)
+                else:
+                    writer.write(analysis.pgn + '\n\n')
+                # - the game is in the output before the checkpoint moves past it, and the checkpoint
+                #   is replaced in one step, so that a crash never leaves half of it behind
+                writer.flush()
+                with open(f'{checkpoint}.tmp', 'w') as f:
+                    f.write(str(end))
+                os.replace(f'{checkpoint}.tmp', checkpoint)
+                games += 1
+                logger.info(f'Game {games} at offset {analysis.offset}: {len(analysis.scores)} positions')
+    finally:
+        writer.close()
+    return games
+
+
+def _analyse_games(path: str, jobs: Iterator[tuple[int, int]], player: type[BasePlayer], player_args: dict,
+                   depth: int | None, movetime: int | None, n_workers: int, max_in_flight: int,
+                   max_games: int | None) -> Iterator[tuple[GameAnalysis, int]]:
+    """ the analyses of the games in the order of jobs, with the end offsets of the games """
+    if max_games is not None:
+        jobs = (job for _, job in zip(range(max_games), jobs))
+    if n_workers < 2:
+        _init_worker(path, player, player_args, movetime)
+        try:
+            for start, end in jobs:
+                yield analyse_game(start, depth, movetime), end
+        finally:
+            _close_worker()
+        return None
+    with ProcessPoolExecutor(n_workers, mp_context=mp.get_context('spawn'), initializer=_init_worker,
+                             initargs=(path, player, player_args, movetime)) as pool:
+        # - the scan stays at most max_in_flight games ahead of the output
+        pending: deque[tuple[Future, int]] = deque()
+        for start, end in jobs:
+            pending.append((pool.submit(analyse_game, start, depth, movetime), end))
+            if len(pending) >= max_in_flight:
+                future, end = pending.popleft()
+                yield future.result(), end
+        while pending:
+            future, end = pending.popleft()
+            yield future.result(), end
+    return None
+
+
+def _header_filter(equals: list[str], min_elo: int | None) -> Callable[[chess.pgn.Headers], bool] | None:
+    """ accept games whose headers have the given KEY=VALUE pairs and both players at least min_elo """
+    pairs: list[tuple[str, str]] = [tuple(pair.split('=', 1)) for pair in equals]  # type: ignore[misc]
+    if not pairs and min_elo is None:
+        return None
+
+    def accept(headers: chess.pgn.Headers) -> bool:
+        if any(headers.get(key) != value for key, value in pairs):
+            return False
+        if min_elo is None:
+            return True
+        elos: list[str] = [headers.get('WhiteElo', ''), headers.get('BlackElo', '')]
+        return all(elo.isdigit() and int(elo) >= min_elo for elo in elos)
+    return accept
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Evaluate every position of the games in a pgn file')
+    parser.add_argument('pgn', type=str, help='the pgn file to analyse')
+    parser.add_argument('output', type=str, help='annotated .pgn file or directory of column files')
+    parser.add_argument('--engine', choices=['minimax', 'fish'], default='minimax', help='the player to evaluate with')
+    parser.add_argument('--depth', type=int, default=None, help='deepest iteration per position')
+    parser.add_argument('--movetime', type=int, default=100, help='milliseconds per position, 0 for depth only')
+    parser.add_argument('--workers', type=int, default=1, help='number of processes analysing games')
+    parser.add_argument('--header', type=str, action='append', default=[], help='only games with header KEY=VALUE')
+    parser.add_argument('--min-elo', type=int, default=None, help='only games where both players are rated this high')
+    parser.add_argument('--offset', type=int, default=None, help='start at this offset instead of resuming')
+    parser.add_argument('--max-games', type=int, default=None, help='stop after this many games')
+    args = parser.parse_args()
+    if not args.movetime and args.depth is None:
+        parser.error('--movetime 0 needs a --depth, otherwise the search never stops')
+
+    logging.basicConfig(level=logging.INFO)
+    for name in ('BaseMiniMaxPlayer', 'chess.engine'):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    analyse_pgn(args.pgn, args.output, player=PlayerMiniMax if args.engine == 'minimax' else TheFish,
+                depth=args.depth, movetime=args.movetime or None, n_workers=args.workers,
+                accept=_header_filter(args.header, args.min_elo), start_offset=args.offset, max_games=args.max_games)
+    return None
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,410 @@
+from .players.player_minimax import PlayerMiniMax, generate_legal_moves, _eval
+from .players.timing import TimeManager
+from .players.stats import SearchStats
+from .players.evaluation import Evaluator, SIMPLE_PST, pack_boards, pack_positions
+from .players.nnue import NNUEEvaluator
+from .players.position import SearchPosition
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from typing import Callable
+import subprocess
+import tracemalloc
+import platform
+import json
+import time
+import gc
+import numpy as np
+import os
+import chess
+
+
+TACTICS_EPD: str = os.path.join(os.path.dirname(__file__), 'data', 'tactics.epd')
+
+
+# - middlegame positions the benchmarks are run on
+BENCH_FENS: list[str] = [
+    chess.STARTING_FEN,
+    'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4',
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+]
+
+# - standard perft positions with their known node counts per depth
+PERFT_SUITE: dict[str, tuple[str, list[int]]] = {
+    'startpos': (chess.STARTING_FEN, [20, 400, 8902, 197281, 4865609]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', [48, 2039, 97862, 4085603]),
+    'position3': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238, 674624]),
+    'position4': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', [6, 264, 9467, 422333]),
+    'position5': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379, 2103487]),
+}
+
+
+def perft(state: chess.Board, depth: int) -> int:
+    """ number of leaf nodes of the legal move tree up to depth """
+    if depth <= 1:
+        return state.legal_moves.count() if depth else 1
+    nodes: int = 0
+    for move in state.legal_moves:
+        state.push(move)
+        nodes += perft(state, depth - 1)
+        state.pop()
+    return nodes
+
+
+def walk_copy(state: chess.Board, depth: int) -> int:
+    """ visit every node up to depth, copying the board for every child """
+    if not depth or state.is_game_over():
+        return 1
+    nodes: int = 1
+    for move in state.legal_moves:
+        child_board = state.copy()
+        child_board.push(move)
+        nodes += walk_copy(child_board, depth - 1)
+    return nodes
+
+
+def walk_make_unmake(state: chess.Board, depth: int) -> int:
+    """ visit every node up to depth, pushing and popping moves on a single board """
+    if not depth or state.is_game_over():
+        return 1
+    nodes: int = 1
+    for move in state.legal_moves:
+        state.push(move)
+        nodes += walk_make_unmake(state, depth - 1)
+        state.pop()
+    return nodes
+
+
+def measure(func: Callable[[], int]) -> dict[str, float]:
+    """ run func twice, once timed and once with allocation tracing
+    Takes:
+        - func: (callable) runs the workload and returns the number of visited nodes
+    """
+    gc.collect()
+    collections: int = gc.get_stats()[0]['collections']
+    t0 = time.perf_counter()
+    nodes: int = func()
+    seconds: float = time.perf_counter() - t0
+    collections = gc.get_stats()[0]['collections'] - collections
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'nodes': nodes, 'seconds': seconds, 'nodes_per_second': nodes / seconds,
+            'gc_collections': collections, 'peak_kib': peak / 1024}
+
+
+def bench_make_unmake(depth: int = 3, fens: list[str] | None = None) -> dict[str, dict[str, float]]:
+    """ compare copying the board per node with make / unmake on one board, once on
+    a plain tree walk and once on the fixed depth alpha beta search of PlayerMiniMax.
+    Takes:
+        - depth: (int) the depth of the tree walk and of the search
+        - fens: (optional list[str]) the positions to run on, defaults to BENCH_FENS
+    """
+    boards: list[chess.Board] = [chess.Board(fen) for fen in (BENCH_FENS if fens is None else fens)]
+    results: dict[str, dict[str, float]] = {
+        'walk_copy': measure(lambda: sum(walk_copy(board, depth) for board in boards)),
+        'walk_make_unmake': measure(lambda: sum(walk_make_unmake(board, depth) for board in boards)),
+    }
+
+    players: list[PlayerMiniMax] = [PlayerMiniMax(color=board.turn, tt_size_mb=1) for board in boards]
+
+    def search() -> int:
+        nodes: int = 0
+        for board, player in zip(boards, players):
+            player.tt.clear()
+            player.n_iter = 0
+            position: SearchPosition = SearchPosition.from_board(board)
+            player.evaluator.reset(position)
+            player.negamax(position, depth)
+            nodes += player.n_iter
+        return nodes
+    results['minimax'] = measure(search)
+    return results
+
+
+def bench_perft(depth: int = 3) -> dict[str, dict]:
+    """ move generation throughput of python-chess and of the SearchPosition of the search on the 
+    perft suite, both checked against the known counts
+    Takes:
+        - depth: (int) the perft depth, capped at the deepest known count of each position
+    """
+    results: dict[str, dict] = {}
+    for name, (fen, counts) in PERFT_SUITE.items():
+        target: int = min(depth, len(counts))
+        t0 = time.perf_counter()
+        nodes: int = perft(chess.Board(fen), target)
+        seconds: float = time.perf_counter() - t0
+        position: SearchPosition = SearchPosition.from_fen(fen)
+        t0 = time.perf_counter()
+        position_nodes: int = position.perft(target)
+        position_seconds: float = time.perf_counter() - t0
+        results[name] = {'depth': target, 'nodes': nodes, 'ok': nodes == counts[target - 1],
+                         'seconds': seconds, 'nodes_per_second': nodes / seconds,
+                         'search_position': {'nodes': position_nodes, 'ok': position_nodes == counts[target - 1],
+                                             'seconds': position_seconds, 'speedup': seconds / position_seconds}}
+    return results
+
+
+def bench_search(depth: int = 4, fens: list[str] | None = None, **player_args) -> dict[str, dict]:
+    """ time to depth and nodes per second of the iterative deepening minimax on fixed positions
+    Takes:
+        - depth: (int) the deepest iteration
+        - fens: (optional list[str]) the positions to run on, defaults to BENCH_FENS
+        - player_args: extra arguments to give to PlayerMiniMax
+    """
+    results: dict[str, dict] = {}
+    for fen in BENCH_FENS if fens is None else fens:
+        per_depth: list[dict[str, float]] = []
+        for target in range(1, depth + 1):
+            board = chess.Board(fen)
+            player = PlayerMiniMax(color=board.turn, stats=True, **player_args)
+            t0 = time.perf_counter()
+            move: chess.Move | None = player.choose_move(board, 10 ** 9, target)
+            seconds: float = time.perf_counter() - t0
+            stats: SearchStats = player.last_stats  # type: ignore[assignment]
+            per_depth.append({'depth': target, 'seconds': seconds, 'nodes': player.n_iter,
+                              'nodes_per_second': player.n_iter / seconds, 'move': str(move),
+                              'cutoff_rate': stats.cutoff_rate, 'first_move_cutoff_rate': stats.first_move_cutoff_rate,
+                              'tt_hit_rate': stats.tt_hit_rate, 'branching_factor': stats.branching_factor})
+            player.close()
+        results[fen] = {'time_to_depth': per_depth}
+    return results
+
+
+# - the switches of the selective search, each one is measured on its own and all of them together
+SELECTIVE: tuple[str, ...] = ('pvs', 'null_move', 'lmr', 'aspiration')
+
+
+def bench_selective(depth: int = 5, fens: list[str] | None = None) -> dict[str, dict]:
+    """ nodes searched to a fixed depth by plain alpha beta, with each selective search technique 
+    alone and with all of them, the savings are relative to plain alpha beta
+    Takes:
+        - depth: (int) the deepest iteration
+        - fens: (optional list[str]) the positions to run on, defaults to BENCH_FENS
+    """
+    configs: dict[str, dict[str, bool]] = {'alpha_beta': dict.fromkeys(SELECTIVE, False)}
+    configs.update({name: {switch: switch == name for switch in SELECTIVE} for name in SELECTIVE})
+    configs['all'] = dict.fromkeys(SELECTIVE, True)
+    results: dict[str, dict] = {}
+    for name, switches in configs.items():
+        nodes, seconds = 0, 0.
+        moves: list[str] = []
+        for fen in BENCH_FENS if fens is None else fens:
+            board = chess.Board(fen)
+            player = PlayerMiniMax(color=board.turn, stats=True, **switches)
+            t0 = time.perf_counter()
+            moves.append(str(player.choose_move(board, 10 ** 9, depth)))
+            seconds += time.perf_counter() - t0
+            nodes += player.n_iter
+            player.close()
+        results[name] = {'depth': depth, 'nodes': nodes, 'seconds': seconds, 'moves': moves}
+    for result in results.values():
+        result['node_savings'] = 1 - result['nodes'] / results['alpha_beta']['nodes']
+    return results
+
+
+def bench_minimax_slow(depth: int = 2, fens: list[str] | None = None) -> dict[str, dict[str, float]]:
+    """ nodes per second of the brute force minimax without pruning """
+    results: dict[str, dict[str, float]] = {}
+    for fen in BENCH_FENS if fens is None else fens:
+        board = chess.Board(fen)
+        player = PlayerMiniMax(color=board.turn, tt_size_mb=0)
+        nodes: list[int] = [0]
+
+        def counted(func: Callable) -> Callable:
+            def wrapper(*args, **kwargs):
+                nodes[0] += 1
+                return func(*args, **kwargs)
+            return wrapper
+        # - count the nodes by wrapping the recursion on the instance
+        player.minimax_slow = counted(player.minimax_slow)  # type: ignore[method-assign]
+        t0 = time.perf_counter()
+        player.minimax_slow(board, board.turn, depth, None)
+        seconds: float = time.perf_counter() - t0
+        results[fen] = {'depth': depth, 'seconds': seconds, 'nodes': nodes[0], 'nodes_per_second': nodes[0] / seconds}
+    return results
+
+
+def bench_calls(repeats: int = 2000, fens: list[str] | None = None) -> dict[str, dict[str, float]]:
+    """ calls per second of the leaf evaluation and the move generation of the search """
+    boards: list[chess.Board] = [chess.Board(fen) for fen in (BENCH_FENS if fens is None else fens)]
+    results: dict[str, dict[str, float]] = {}
+    player = PlayerMiniMax(tt_size_mb=0)
+    # - the search orders the moves of its own positions
+    positions: dict[int, SearchPosition] = {id(board): SearchPosition.from_board(board) for board in boards}
+    functions: dict[str, Callable] = {
+        '_eval': lambda board: _eval(board, True),
+        'generate_legal_moves': generate_legal_moves,
+        'ordered_moves': lambda board: list(player.orderer.moves(positions[id(board)])),
+    }
+    for name, func in functions.items():
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            for board in boards:
+                func(board)
+        seconds: float = time.perf_counter() - t0
+        calls: int = repeats * len(boards)
+        results[name] = {'calls': calls, 'seconds': seconds, 'calls_per_second': calls / seconds}
+    return results
+
+
+def bench_batch_eval(n_positions: int = 20000, seed: int = 1337) -> dict[str, dict[str, float]]:
+    """ positions per second of the batched evaluation against scoring the boards one at a time
+    Takes:
+        - n_positions: (int) the number of random positions to score
+        - seed: (int) the seed of the random games the positions are taken from
+    """
+    rng = np.random.default_rng(seed)
+    boards: list[chess.Board] = []
+    while len(boards) < n_positions:
+        board = chess.Board()
+        for _ in range(rng.integers(1, 120)):
+            moves: list[chess.Move] = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(moves[rng.integers(len(moves))])
+        boards.append(board.copy(stack=False))
+    player = PlayerMiniMax(tt_size_mb=0)
+    evaluator, pst_evaluator = Evaluator(), Evaluator(pst=SIMPLE_PST)
+    functions: dict[str, Callable] = {
+        'value_function': lambda: [player.value_function(board) for board in boards],
+        'pack_boards': lambda: pack_boards(boards),
+    }
+    positions: list[SearchPosition] = [SearchPosition.from_board(board) for board in boards]
+    functions['pack_positions'] = lambda: pack_positions(positions)
+    packed: np.ndarray = pack_boards(boards)
+    functions['evaluate_batch'] = lambda: evaluator.evaluate_batch(packed)
+    functions['evaluate_batch_pst'] = lambda: pst_evaluator.evaluate_batch(packed)
+    results: dict[str, dict[str, float]] = {}
+    for name, func in functions.items():
+        t0 = time.perf_counter()
+        func()
+        seconds: float = time.perf_counter() - t0
+        results[name] = {'positions': n_positions, 'seconds': seconds, 'positions_per_second': n_positions / seconds}
+    return results
+
+
+def bench_evaluators(movetime: int = 1000, nnue: str | None = None, 
+                     fens: list[str] | None = None) -> dict[str, dict[str, float]]:
+    """ nodes per second of the search with each of the leaf evaluations. The searches are limited in 
+    time rather than depth, an untrained network orders the moves too badly to reach the same depths.
+    Takes:
+        - movetime: (int) the thinking time per position in milliseconds
+        - nnue: (optional str) npz weights of the network, an untrained network of the default size otherwise
+        - fens: (optional list[str]) the positions to run on, defaults to BENCH_FENS
+    """
+    evaluators: dict[str, Evaluator | NNUEEvaluator] = {
+        'material': Evaluator(),
+        'pst': Evaluator(pst=SIMPLE_PST),
+        'nnue': NNUEEvaluator.random() if nnue is None else NNUEEvaluator.load(nnue),
+    }
+    results: dict[str, dict[str, float]] = {}
+    for name, evaluator in evaluators.items():
+        nodes, seconds = 0, 0.
+        for fen in BENCH_FENS if fens is None else fens:
+            board = chess.Board(fen)
+            timer = TimeManager(moves_to_go=1, min_moves_to_go=1, overhead=0)
+            player = PlayerMiniMax(color=board.turn, evaluator=evaluator, timer=timer)
+            t0 = time.perf_counter()
+            player.choose_move(board, movetime, move_fraction=1.)
+            seconds += time.perf_counter() - t0
+            nodes += player.n_iter
+        results[name] = {'movetime': movetime, 'nodes': nodes, 'seconds': seconds, 'nodes_per_second': nodes / seconds}
+    return results
+
+
+def bench_tactics(movetime: int = 1000, path: str = TACTICS_EPD, **player_args) -> dict:
+    """ solve rate of PlayerMiniMax on an epd suite with best move (bm) operations
+    Takes:
+        - movetime: (int) the thinking time per position in milliseconds
+        - path: (str) the epd file, defaults to the bundled tactics suite
+        - player_args: extra arguments to give to PlayerMiniMax
+    """
+    positions: list[dict] = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            board, operations = chess.Board.from_epd(line)
+            timer = TimeManager(moves_to_go=1, min_moves_to_go=1, overhead=0)
+            player = PlayerMiniMax(color=board.turn, timer=timer, **player_args)
+            move: chess.Move | None = player.choose_move(board, movetime, move_fraction=1.)
+            player.close()
+            positions.append({'id': operations.get('id', board.epd()), 'move': str(move),
+                              'solved': move in operations.get('bm', [])})
+    solved: int = sum(position['solved'] for position in positions)
+    return {'movetime': movetime, 'solved': solved, 'total': len(positions),
+            'solve_rate': solved / max(len(positions), 1), 'positions': positions}
+
+
+def _metadata() -> dict[str, str]:
+    """ where and when the benchmark ran, so that runs of different commits can be compared """
+    try:
+        commit: str = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(__file__),
+                                     capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {'commit': commit, 'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(), 'chess': chess.__version__, 'machine': platform.platform()}
+
+
+SUITES: tuple[str, ...] = ('perft', 'search', 'selective', 'minimax_slow', 'calls', 'batch_eval', 'evaluators',
+                           'tactics', 'make_unmake')
+
+
+def run(suites: tuple[str, ...] = SUITES, *, perft_depth: int = 3, depth: int = 4, slow_depth: int = 2,
+        walk_depth: int = 2, movetime: int = 1000, nnue: str | None = None) -> dict:
+    """ run the selected benchmark suites and collect their results in a json serialisable dict """
+    results: dict = {'meta': _metadata()}
+    for suite in suites:
+        match suite:
+            case 'perft':
+                results[suite] = bench_perft(perft_depth)
+            case 'search':
+                results[suite] = bench_search(depth)
+            case 'selective':
+                results[suite] = bench_selective(depth + 1)
+            case 'minimax_slow':
+                results[suite] = bench_minimax_slow(slow_depth)
+            case 'calls':
+                results[suite] = bench_calls()
+            case 'batch_eval':
+                results[suite] = bench_batch_eval()
+            case 'evaluators':
+                results[suite] = bench_evaluators(movetime, nnue)
+            case 'tactics':
+                results[suite] = bench_tactics(movetime)
+            case 'make_unmake':
+                results[suite] = bench_make_unmake(walk_depth)
+            case _:
+                raise ValueError(f'Unknown benchmark suite: {suite}')
+    return results
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Benchmarks of the schmittie_chess engine')
+    parser.add_argument('--suites', type=str, default=','.join(SUITES), help='comma separated suites to run')
+    parser.add_argument('--perft-depth', type=int, default=3, help='depth of the perft runs')
+    parser.add_argument('--depth', type=int, default=4, help='deepest iteration of the minimax search')
+    parser.add_argument('--slow-depth', type=int, default=2, help='depth of the minimax without pruning')
+    parser.add_argument('--walk-depth', type=int, default=2, help='depth of the copy vs make / unmake walks')
+    parser.add_argument('--movetime', type=int, default=1000, help='milliseconds per tactics position')
+    parser.add_argument('--nnue', type=str, default=None, help='npz weights of the network to compare')
+    parser.add_argument('--output', type=str, default=None, help='write the results as json to this file')
+    args = parser.parse_args()
+
+    results = run(tuple(args.suites.split(',')), perft_depth=args.perft_depth, depth=args.depth,
+                  slow_depth=args.slow_depth, walk_depth=args.walk_depth, movetime=args.movetime, nnue=args.nnue)
+    text: str = json.dumps(results, indent=2)
+    if args.output is None:
+        print(text)
+        return None
+    with open(args.output, 'w') as f:
+        f.write(text)
+    return None
+
+
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,12 @@ from pygame.surface import Surface
 from pygame.font import SysFont, Font
 from .pieces import TextureHolder
 from .mouse import Mover
+from ..record import GameRecord
 from itertools import product
-from numpy import unravel_index
 import logging
 import chess
 import chess.pgn
+import chess.polyglot
 import pygame
 import io
 
@@ -20,10 +21,12 @@ class Board:
     _BLACK: tuple[int, int, int] = (135, 95, 60)
     _WHITE: tuple[int, int, int] = (255, 255, 200)
     
-    def __init__(self, fen: str | None = None, folder: str = 'greenchess') -> None:
+    def __init__(self, fen: str | None = None, folder: str = 'greenchess', texture_cache: str | None = None) -> None:
         """ Initialiser of Board instance
         Takes: 
             - fen: (optional str) the fen to start from
+            - folder: (str) the theme of the pieces
+            - texture_cache: (optional str) directory to keep pre-scaled piece images in between runs
         """
         self.logger = logging.getLogger(__name__)
 
@@ -31,7 +34,8 @@ class Board:
             self.board: chess.Board = chess.Board()
         else:
             self.board: chess.Board = chess.Board(fen=fen)
-        self._pgn: dict[int, list[str]] = {}
+        # - the moves of the game as 16 bit codes, SAN is only rendered by pgn()
+        self.record: GameRecord = GameRecord(self.board.fen())
 
         # - setup board rank and file annotations
         self.font: Font = SysFont('computermodern', 24)
@@ -40,11 +44,19 @@ class Board:
         self.file_letters: list = [self.font.render(_file, False, 'white') 
                                    for _file in const.FILENAMES]
         # - pieces with rendering information
-        self.textures = TextureHolder(folder=folder)
+        self.textures = TextureHolder(folder=folder, cache_dir=texture_cache)
 
         # - mover to generate the moves for the player
         self.mover = Mover()
 
+        # - pre-rendered board and rim, and what was last drawn on every square, None forces a full redraw
+        self._background: Surface | None = None
+        self._drawn: dict[int, tuple[str | None, bool]] | None = None
+
+        # - legal moves of the current position by from square, built once per position, None when stale
+        self._legal_index: dict[int, list[chess.Move]] | None = None
+        self._legal_index_key: int = 0
+
     @classmethod
     def from_fen(cls, fen: str) -> Self:
         """make class from fen
@@ -55,24 +67,108 @@ class Board:
     
     @classmethod
     def from_pgn(cls, pgn: str) -> Self:
+        """ make class from the first game of a pgn, the moves of its mainline are played on the board """
         game: chess.pgn.Game | None = chess.pgn.read_game(io.StringIO(pgn))
         if game is None:
             return cls()
-        return cls(game.board().fen())
+        board = cls(game.board().fen())
+        for move in game.mainline_moves():
+            board.push(move)
+        return board
+
+    @classmethod
+    def from_record(cls, record: GameRecord) -> Self:
+        """ make class from a game record, its moves are played on the board """
+        board = cls(record.fen)
+        for move in record:
+            board.push(move)
+        return board
     
     def reset(self) -> None:
         """ reset the current board to the starting position """
         self.logger.debug('Resetting Board Position: ')
         self.board.reset()
-        self._pgn.clear()
-        self.logger.debug(f'FEN: {self.board.fen()}; PGN: {self._pgn}')
+        self._legal_index = None
+        self.record.clear(self.board.fen())
+        self.logger.debug(f'FEN: {self.board.fen()}')
         return None
 
     def render_board(self, surface: Surface) -> None:
-        """ render board on the game surface 
+        """ render board on the game surface, the board is drawn once and blitted from a cache afterwards
+        Takes:
+            - surface: (Surface) the game surface to render on
+        """
+        surface.blit(self.background(surface.get_size()), (0, 0))
+        return None
+
+    def background(self, size: tuple[int, int]) -> Surface:
+        """ the empty board with its rim and coordinates, rendered once per window size """
+        if self._background is None or self._background.get_size() != size:
+            self._background = Surface(size)
+            self._draw_board(self._background)
+        return self._background
+
+    def invalidate(self) -> None:
+        """ forget what is on the screen, the next render_dirty redraws everything """
+        self._drawn = None
+        return None
+
+    def square_rect(self, square: int) -> pygame.Rect:
+        """ the area of a square on the game surface """
+        col, row = chess.square_file(square), const.ROW_HASH[chess.square_rank(square)]
+        return pygame.Rect(const.OFFSET + col * const.SQSIZE, const.OFFSET + row * const.SQSIZE, const.SQSIZE, const.SQSIZE)
+
+    def render_dirty(self, surface: Surface, color: str = '#013220', size: float = 0.1) -> list[pygame.Rect]:
+        """ redraw only the squares whose piece or legal move marker changed since the last call
         Takes:
             - surface: (Surface) the game surface to render on
+            - color: (str) the color of the legal move markers
+            - size: (float) the radius of the legal move markers relative to the square size
+        Returns the areas that were drawn, to be given to pygame.display.update.
         """
+        rects: list[pygame.Rect] = []
+        if self._drawn is None:
+            self.render_board(surface)
+            self._drawn = {}
+            rects.append(surface.get_rect())
+        background: Surface = self.background(surface.get_size())
+        pieces: dict[int, chess.Piece] = self.board.piece_map()
+        targets: set[int] = self._legal_targets()
+        for square in chess.SQUARES:
+            piece: chess.Piece | None = pieces.get(square)
+            content: tuple[str | None, bool] = (None if piece is None else piece.symbol(), square in targets)
+            if self._drawn.get(square) == content:
+                continue
+            self._drawn[square] = content
+            rect: pygame.Rect = self.square_rect(square)
+            surface.blit(background, rect, rect)
+            if piece is not None:
+                img: Surface = self.textures[f'{const.color(piece.color)}-{chess.piece_name(piece.piece_type)}']
+                surface.blit(img, img.get_rect(center=rect.center))
+            if content[1]:
+                pygame.draw.circle(surface, color, rect.center, const.SQSIZE * size)
+            rects.append(rect)
+        return rects
+
+    def _legal_targets(self) -> set[int]:
+        """ target squares of the legal moves of the selected piece """
+        if not self.mover.moving:
+            return set()
+        return {move.to_square for move in self.legal_moves_from(self.mover.init_square)}
+
+    def legal_moves_from(self, square: int) -> list[chess.Move]:
+        """ the legal moves of the piece on square, looked up in an index of the current position """
+        key: int = chess.polyglot.zobrist_hash(self.board)
+        if self._legal_index is None or self._legal_index_key != key:
+            # - the key also catches moves pushed or popped on the chess.Board directly, unlike the ply 
+            #   it differs after taking back a move and playing another one
+            index: dict[int, list[chess.Move]] = {}
+            for move in self.board.legal_moves:
+                index.setdefault(move.from_square, []).append(move)
+            self._legal_index, self._legal_index_key = index, key
+        return self._legal_index.get(square, [])
+
+    def _draw_board(self, surface: Surface) -> None:
         # - make brown edge around the board to display rank and file on
         surface.fill('#1e140a')
         # - offset due to the outside board
@@ -92,45 +188,12 @@ class Board:
                 surface.blit(self.rank_letters[const.ROW_HASH[row]], file_rect) 
         return None
 
-    def render_pieces(self, surface: Surface) -> None:
-        """ render pieces on the game surface
-        Takes:
-            - surface: (Surface) the game surface to render on
-        """
-        # - offset to center pieces with board that has rim around it
-        offset: int | float = const.OFFSET
-        # - go through all pieces to place them on the board
-        for piece_type, piece_color in product(const.PIECES, [const.WHITE, const.BLACK]):
-            # - get square set for each piece type
-            positions: chess.SquareSet = self.board.pieces(piece_type, piece_color)
-            piece_name: str = chess.piece_name(piece_type)
-            color: str = const.color(piece_color)
-            # - iterate through set and position corresponding image
-            for pos in positions:
-                img: Surface = self.textures[f'{color}-{piece_name}']
-                row, col = unravel_index(pos, (const.COLS, const.ROWS))
-                center = (offset + (col + 0.5) * const.SQSIZE, offset + (const.ROW_HASH[row] + 0.5) * const.SQSIZE)
-                surface.blit(img, img.get_rect(center=center))
-
-    def render_legal_moves_with_piece(self, surface: Surface, color: str = '#013220', size: float = 0.1) -> None:
-        """ renders the legal moves with the selected piece """
-        if not self.mover.moving:
-            return
-        legal_moves_from_square: list[chess.Move] = [m for m in self.board.legal_moves if m.uci().startswith(self.mover.init_square_name)]
-        target_squares: list[str] = [m.uci()[2:4] for m in legal_moves_from_square]
-        for square in target_squares:
-            row, col = [float(el) for el in unravel_index(chess.parse_square(square), (const.COLS, const.ROWS))]  # whacky for killing type error
-            row = const.ROW_HASH[int(row)]
-            center: tuple[float, float] = (const.OFFSET + (col + 0.5) * const.SQSIZE, const.OFFSET + (row + 0.5) * const.SQSIZE)
-            radius: float | int = const.SQSIZE * size
-            pygame.draw.circle(surface, color, center, radius)
-
     def check_user_legal_move(self, promotion: str = 'q') -> bool:
         """ checks if the selected mouse clicks are indeed legal moves. """
         mv: chess.Move | None = self.get_move(promotion)
         if mv is None:
             return False
-        return mv in self.board.legal_moves
+        return mv in self.legal_moves_from(mv.from_square)
     
     def update(self, move: None | chess.Move) -> None:
         self.push(move)
@@ -138,37 +201,31 @@ class Board:
     
     def get_move(self, promotion: str = 'q') -> chess.Move | None:
         """ get move, if promotion available choose queen by default. """
-        move_uci = self.mover.init_square_name + self.mover.final_square_name
-        moves = [mv for mv in self.board.legal_moves if mv.uci().startswith(move_uci)]
+        moves = [mv for mv in self.legal_moves_from(self.mover.init_square) if mv.to_square == self.mover.final_square]
         if not len(moves):
             return None
         elif len(moves) > 1:
-            return chess.Move.from_uci(move_uci + promotion)
+            return chess.Move(self.mover.init_square, self.mover.final_square, chess.PIECE_SYMBOLS.index(promotion))
         return moves[0]
 
     def push(self, move: chess.Move | None) -> None:
         """ push a move on the board """
         if move is None:
             return None
-        if self.board.fullmove_number in self._pgn:
-            self._pgn[self.board.fullmove_number].append(self.board.san(move))
-        else:
-            self._pgn[self.board.fullmove_number] = [self.board.san(move)]
+        self.record.push(move)
         self.board.push(move)
+        self._legal_index = None
 
     def undo_last_move(self) -> None:
         """ undo the last move made """
-        self.logger.warning(self.board.ply())
-        if not self.board.ply():
+        self.logger.debug(f'Undoing ply {self.board.ply()}')
+        if not self.record:
             return None
-        mvnumber = self.board.fullmove_number - 1 if self.board.turn else self.board.fullmove_number
-        self.logger.warning(mvnumber)
         self.board.pop()
-        self._pgn[mvnumber].pop()
-        if self._pgn[mvnumber]:
-            return None
-        self._pgn.pop(mvnumber)
+        self.record.pop()
+        self._legal_index = None
         return None
 
     def pgn(self) -> str:
-        return ' '.join([f'{k}. {" ".join(it)}' for k, it in self._pgn.items()]) + f' {self.board.result()}'
+        """ the moves of the game with move numbers and the result """
+        return self.record.pgn(self.board.result())
@@ -6,22 +6,95 @@ import os
 import logging
 
 
+# - names of the textures of a theme, in the order they are laid out in an atlas
+TEXTURE_NAMES: list[str] = [f'{const.color(color)}-{chess.piece_name(piece)}'
+                            for color, piece in product([const.WHITE, const.BLACK], const.PIECES)]
+
+# - scaled textures shared by every TextureHolder of the process, keyed by (folder, square size)
+_CACHE: dict[tuple[str, int], dict[str, pygame.Surface]] = {}
+# - keys of the textures in the cache that are converted to the pixel format of the display
+_CONVERTED: set[tuple[str, int, str]] = set()
+
+
+def clear_cache() -> None:
+    """ drop all cached textures, e.g. after the display mode changed """
+    _CACHE.clear()
+    _CONVERTED.clear()
+    return None
+
+
 class TextureHolder():
-    def __init__(self, folder: str = 'greenchess') -> None:
+    """ the piece images of a theme scaled to the square size. Images are loaded on first use
+    and kept in a cache shared by the whole process, so boards with the same theme and size
+    share them and switching back to a theme costs nothing. Once a display exists the images
+    are converted to its pixel format, which makes blitting them a lot cheaper. """
+    def __init__(self, folder: str = 'greenchess', size: int | None = None, cache_dir: str | None = None) -> None:
+        """ Initialiser of the TextureHolder
+        Takes:
+            - folder: (str) the theme in the pictures folder, e.g. 'greenchess', 'funkey' or 'default'
+            - size: (optional int) the square size the images are scaled to, defaults to const.SQSIZE
+            - cache_dir: (optional str) directory to keep an atlas of the scaled images of the theme in,
+                         later runs load the one atlas instead of decoding and scaling every image
+        """
         self.logger = logging.getLogger(__name__)
         self.folder: str = folder
-        piece_names = [chess.piece_name(piece) for piece in const.PIECES]
-        colors = [const.WHITE, const.BLACK]
-        self.logger.debug(f'Loading the pictures from {folder} folder.')
-        self.textures = {f'{const.color(color)}-{name}': pygame.image.load(get_texture(name, color, folder)) 
-                         for name, color in product(piece_names, colors)}
-        self.textures = {key: pygame.transform.scale(item, (const.SQSIZE * 0.95, const.SQSIZE * 0.95)) 
-                         for key, item in self.textures.items()}
+        self.size: int = const.SQSIZE if size is None else size
+        self.cache_dir: str | None = cache_dir
+        self._key: tuple[str, int] = (folder, self.size)
+        self.textures: dict[str, pygame.Surface] = _CACHE.setdefault(self._key, {})
+        return None
 
     def __getitem__(self, key: str | int | float) -> pygame.Surface:
-        if key in self.textures:
-            return self.textures[key]
-        raise KeyError(f'Invalid Key for texture holder: {key}')
+        if key not in TEXTURE_NAMES:
+            raise KeyError(f'Invalid Key for texture holder: {key}')
+        if key not in self.textures:
+            self._load(key)
+        if pygame.display.get_surface() is not None and (*self._key, key) not in _CONVERTED:
+            # - keeps the alpha channel and matches the pixel format of the screen
+            self.textures[key] = self.textures[key].convert_alpha()
+            _CONVERTED.add((*self._key, key))
+        return self.textures[key]
+
+    def preload(self) -> None:
+        """ load all images of the theme now instead of on first use """
+        for key in TEXTURE_NAMES:
+            self[key]
+        return None
+
+    def _load(self, key: str) -> None:
+        if self.cache_dir is None:
+            self.textures[key] = self._scaled(key)
+            return None
+        # - with an atlas the whole theme is loaded at once
+        atlas_path: str = os.path.join(self.cache_dir, f'{self.folder}-{self.size}.png')
+        if os.path.exists(atlas_path):
+            self.logger.debug(f'Loading the pictures of {self.folder} from the atlas {atlas_path}.')
+            atlas: pygame.Surface = pygame.image.load(atlas_path)
+            side: int = atlas.get_height()
+            for i, name in enumerate(TEXTURE_NAMES):
+                self.textures.setdefault(name, atlas.subsurface((i * side, 0, side, side)).copy())
+            return None
+        scaled: dict[str, pygame.Surface] = {name: self.textures[name] if name in self.textures else self._scaled(name)
+                                            for name in TEXTURE_NAMES}
+        self.textures.update({name: surface for name, surface in scaled.items() if name not in self.textures})
+        side = scaled[key].get_height()
+        atlas = pygame.Surface((side * len(TEXTURE_NAMES), side), pygame.SRCALPHA)
+        for i, name in enumerate(TEXTURE_NAMES):
+            atlas.blit(scaled[name], (i * side, 0))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pygame.image.save(atlas, atlas_path)
+        except (OSError, pygame.error) as error:
+            self.logger.warning(f'Could not write the texture atlas {atlas_path}: {error}')
+        return None
+
+    def _scaled(self, key: str) -> pygame.Surface:
+        """ decode the image of a piece and scale it to the square size """
+        color, name = key.split('-')
+        self.logger.debug(f'Loading {key} from the {self.folder} folder.')
+        image: pygame.Surface = pygame.image.load(get_texture(name, color == 'white', self.folder))
+        side: int = int(self.size * 0.95)
+        return pygame.transform.scale(image, (side, side))
 
 
 def get_texture(name: str, color: bool, folder: str = 'greenchess') -> str:
@@ -36,4 +109,4 @@ def get_texture(name: str, color: bool, folder: str = 'greenchess') -> str:
     texture: str = os.path.join(_dir, 'pictures', folder, f'{_color}-{name.lower()}.png')
     if not os.path.exists(texture):
         raise FileNotFoundError(f'The File {texture} does not exist!')
-    return texture
\ No newline at end of file
+    return texture
@@ -3,6 +3,7 @@ from ..config import const
 from .board import Board
 from ..players.player import HumanPlayer, BasePlayer, TheFish
 from ..players.player_minimax import PlayerMiniMax
+from concurrent.futures import ThreadPoolExecutor, Future
 from datetime import timedelta
 from chess import Move
 import pygame
@@ -19,7 +20,8 @@ class Game:
     """
     def __init__(self, player_white: PlayerType | None = None, player_black: PlayerType | None = None, 
                  folder: str = 'greenchess', verbosity: int = logging.DEBUG, increment: int = 0,
-                 player_white_args: dict | None = None, player_black_args: dict | None = None) -> None:
+                 player_white_args: dict | None = None, player_black_args: dict | None = None, 
+                 fps: int = 30, texture_cache: str | None = None) -> None:
         """ initialiser for the Game instance, by default human plays as white against
         the MiniMax player V0, which is beatable by someone better than schmitse. 
         Takes: 
@@ -30,14 +32,19 @@ class Game:
             - verbosity: (int) the logger verbosity level
             - increment: (int) the increment per move in milliseconds
             - player_white_args: (optional, dict) extra arguments to give to the white player
-            - player_black_args: (optional, dict) extra arguments to give to the black player
+            - player_black_args: (optional, dict) extra arguments to give to the black player,
+                                 e.g. {'ponder': True} lets the MiniMax player think on the human's time
+            - fps: (int) the most frames drawn per second, while nothing moves the game only wakes
+                   up for input and to update the clock
+            - texture_cache: (optional str) directory to keep pre-scaled piece images in between runs
         """
         pygame.init()
         logging.basicConfig(level=verbosity)
         self.logger = logging.getLogger(__name__)
         self.screen = pygame.display.set_mode((const.WIDTH, const.HEIGHT))
         self.clock = pygame.time.Clock()
-        self.board = Board(folder=folder)
+        self.fps: int = fps
+        self.board = Board(folder=folder, texture_cache=texture_cache)
         self.running = True
 
         self.time_white: int = 10 * 60 * 1000
@@ -45,6 +52,8 @@ class Game:
         self.move_times: dict[bool, list[int]] = {True: [], False: []}
         self.increment: int = increment
         self.timefont: pygame.font.Font = pygame.font.SysFont('computermodern', 80, bold=True)
+        # - the clock texts on screen, they are only rendered again when they change
+        self._clock_text: dict[bool, str] = {}
 
         player_white = HumanPlayer if player_white is None else player_white
         player_black = PlayerMiniMax if player_black is None else player_black
@@ -52,52 +61,83 @@ class Game:
         player_black_args = {} if player_black_args is None else player_black_args
         self.players = {True: player_white(color=True, **player_white_args), 
                         False: player_black(color=False, **player_black_args)}
+
+        # - engine players think in a background thread so that the window stays responsive
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='engine')
+        self._search: Future | None = None
+        self._search_start: float = 0.
+        self._ponder: Future | None = None
         return None
     
     def mainloop(self) -> None:
-        """ main loop of the game UI """
+        """ main loop of the game UI. Only the squares and clocks that changed are drawn again, 
+        at most fps times a second, and while no one moves the loop sleeps until the next event """
         mv_time: int = 0
         move: None | Move = None
+        self._invalidate()
         t0 = time.time()
         while self.running:
-            self.clock.tick()
-            self.board.render_board(self.screen)
-            self.board.render_pieces(self.screen)
-            self.board.render_legal_moves_with_piece(self.screen)
-            self._render_time()
+            dirty: list[pygame.Rect] = self.board.render_dirty(self.screen) + self._render_time()
+            if dirty:
+                pygame.display.update(dirty)
 
             if self.board.board.is_game_over():
                 self.running = False
                 self._finalise_game()
 
-            for event in pygame.event.get():
+            for event in self._events(idle=not dirty):
                 if event.type == pygame.QUIT:
                     self.running = False
-                    self._finalise()
+                    self._cancel_search()
                     break
+                if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                    self._invalidate()
 
                 if not self.players[self.board.board.turn].auto:
                     mv_time, move = self._handle_mouse_input(event, mv_time)
                 self._handle_keyboard_events(event)
 
-            if self.players[self.board.board.turn].auto:
+            # - after quitting or the end of the game no new searches are started
+            if self.running and self.players[self.board.board.turn].auto:
                 move = self._handle_computer_player()
+            elif self.running and move is None:
+                self._start_ponder()
+            elif self.running:
+                self._stop_ponder()
             t1 = time.time()
             ctime = int((t1 - t0) * 1000)
+            # - the time spent waiting for events and frames counts as well
+            t0 += ctime / 1000
             mv_time += ctime
             if self.board.board.turn:
                 self.time_white -= ctime
-                self.running = self.time_white > 0
+                self.running = self.running and self.time_white > 0
             else:
                 self.time_black -= ctime
-                self.running = self.time_black > 0
+                self.running = self.running and self.time_black > 0
             move = self.board.update(move)
-
-            pygame.display.flip()
-            t0 = time.time()
+            self.clock.tick(self.fps)
         self._finalise()
         return None
     
+    def _events(self, idle: bool) -> list[pygame.event.Event]:
+        """ the pending events. If nothing was drawn in the last frame and a human is to move, 
+        this sleeps until the next event or until the clock of the human shows the next second. """
+        turn: bool = self.board.board.turn
+        if not idle or self.players[turn].auto:
+            return pygame.event.get()
+        time_left: int = self.time_white if turn else self.time_black
+        event: pygame.event.Event = pygame.event.wait(time_left % 1000 + 1)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
+
+    def _invalidate(self) -> None:
+        """ draw the whole window again in the next frame """
+        self.board.invalidate()
+        self._clock_text.clear()
+        return None
+
     def _handle_keyboard_events(self, event: pygame.event.Event) -> None:
         """ handles various different key presses """
         if event.type != pygame.KEYDOWN:
@@ -105,25 +145,70 @@ class Game:
         match event.key:
             case pygame.K_r:
                 self.logger.debug('Button R was pressed: Resetting Board Position.')
+                self._cancel_search()
                 self.board.reset()
                 self.time_white: int = 10 * 60 * 1000
                 self.time_black: int = 10 * 60 * 1000
             case pygame.K_b:
                 self.logger.debug('Button B was pressed: Reverting last move.')
+                self._cancel_search()
                 self.board.undo_last_move()
             case _:
                 self.logger.error('Unknown Button pressed')
 
-    def _handle_computer_player(self) -> Move:
+    def _handle_computer_player(self) -> Move | None:
+        """ start the search of the engine player in the background and return its move
+        once it arrived, until then None is returned and the main loop keeps running. """
         turn: bool = self.board.board.turn
         player: BasePlayer = self.players[turn]
-        t0 = time.time()
-        move: Move = player.choose_move(self.board.board.copy(), self.time_white if turn else self.time_black)
-        t1 = time.time()
-        # self.board.push(move)
-        self.move_times[turn].append(int((t1 - t0) * 1000))
+        if self._search is None:
+            self._search_start = time.time()
+            player.prepare_search()
+            self._search = self._executor.submit(player.choose_move, self.board.board.copy(),
+                                                 self.time_white if turn else self.time_black,
+                                                 increment=self.increment)
+            return None
+        if not self._search.done():
+            return None
+        search, self._search = self._search, None
+        move: Move | None = search.result()
+        self.move_times[turn].append(int((time.time() - self._search_start) * 1000))
+        if turn:
+            self.time_white += self.increment
+        else:
+            self.time_black += self.increment
         return move
 
+    def _start_ponder(self) -> None:
+        """ let the engine opponent of a human player think on the human's time """
+        opponent: BasePlayer = self.players[not self.board.board.turn]
+        if self._ponder is not None or not opponent.auto or not opponent.pondering:
+            return None
+        opponent.prepare_search()
+        self._ponder = self._executor.submit(opponent.ponder, self.board.board.copy())
+        return None
+
+    def _stop_ponder(self) -> None:
+        """ stop pondering and wait for it, the engine needs its own search next """
+        if self._ponder is None:
+            return None
+        for player in self.players.values():
+            player.stop()
+        self._ponder.result()
+        self._ponder = None
+        return None
+
+    def _cancel_search(self) -> None:
+        """ stop the search in flight, if any, and discard its result """
+        self._stop_ponder()
+        if self._search is None:
+            return None
+        for player in self.players.values():
+            player.stop()
+        self._search.cancel()
+        self._search = None
+        return None
+
     def _handle_mouse_input(self, event: pygame.event.Event, mv_time) -> tuple[int, None | Move]:
         match event.type:
             case pygame.MOUSEBUTTONDOWN:
@@ -158,17 +243,22 @@ class Game:
                 return mv_time, move
         return mv_time, None
 
-    def _render_time(self) -> None:
-        """ renders clocks """
-        tw = timedelta(milliseconds=self.time_white)
-        tb = timedelta(milliseconds=self.time_black)
-        time_white = self.timefont.render(str(tw).split('.')[0], False, '#c3c3c3')
-        time_black = self.timefont.render(str(tb).split('.')[0], False, '#B5B2B3')
-        pos_white = (const.OFFSET + const.SQSIZE * const.COLS + const.TIMEMARGIN, const.OFFSET + const.SQSIZE * (const.ROWS / 2 + 1), const.SQSIZE * 2, const.SQSIZE)
-        pos_black = (const.OFFSET + const.SQSIZE * const.COLS + const.TIMEMARGIN, const.OFFSET + const.SQSIZE * (const.ROWS / 2 - 1), const.SQSIZE * 2, const.SQSIZE)
-        self.screen.blit(time_white, pos_white)
-        self.screen.blit(time_black, pos_black)
-        return None
+    def _render_time(self) -> list[pygame.Rect]:
+        """ renders the clocks that changed since the last frame and returns their areas """
+        rects: list[pygame.Rect] = []
+        background: pygame.Surface = self.board.background(self.screen.get_size())
+        for color, time_left, font_color, rows in ((True, self.time_white, '#c3c3c3', const.ROWS / 2 + 1), 
+                                                   (False, self.time_black, '#B5B2B3', const.ROWS / 2 - 1)):
+            text: str = str(timedelta(milliseconds=max(time_left, 0))).split('.')[0]
+            if self._clock_text.get(color) == text:
+                continue
+            self._clock_text[color] = text
+            left: float = const.OFFSET + const.SQSIZE * const.COLS + const.TIMEMARGIN
+            rect = pygame.Rect(left, const.OFFSET + const.SQSIZE * rows, const.WIDTH - left, self.timefont.get_linesize())
+            self.screen.blit(background, rect, rect)
+            self.screen.blit(self.timefont.render(text, False, font_color), rect)
+            rects.append(rect)
+        return rects
 
     def _finalise_game(self) -> None:
         self.logger.info('PGN for played game: ')
@@ -177,6 +267,12 @@ class Game:
         return None
 
     def _finalise(self) -> None:
+        self._cancel_search()
+        # - the stopped search has to be out of the players before they release their processes and tables
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for player in self.players.values():
+            if hasattr(player, 'close'):
+                player.close()
         self._finalise_game()
         pygame.quit()
         return None
@@ -0,0 +1,219 @@
+from .players.player import BasePlayer
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator
+import multiprocessing as mp
+import numpy as np
+import logging
+import math
+import time
+import chess
+import chess.pgn
+
+
+@dataclass
+class GameResult:
+    """ outcome of a single headless game, seen from player a """
+    pgn: str
+    score: float
+    a_white: bool
+    times_a: list[int] = field(default_factory=list)
+    times_b: list[int] = field(default_factory=list)
+
+
+@dataclass
+class MatchResult:
+    """ win / draw / loss record of player a against player b """
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    times_a: list[int] = field(default_factory=list)
+    times_b: list[int] = field(default_factory=list)
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self) -> float:
+        """ fraction of the points scored by player a """
+        return (self.wins + 0.5 * self.draws) / max(self.games, 1)
+
+    def elo(self, z: float = 1.96) -> tuple[float, float]:
+        """ elo difference of player a over player b and the half width of its confidence interval
+        Takes:
+            - z: (float) the number of standard errors of the interval, 1.96 for 95%
+        """
+        n: int = max(self.games, 1)
+        score: float = self.score
+        variance: float = (self.wins * (1 - score) ** 2 + self.draws * (0.5 - score) ** 2
+                           + self.losses * score ** 2) / n
+        error: float = z * math.sqrt(variance / n)
+        low, high = _elo(score - error), _elo(score + error)
+        return _elo(score), (high - low) / 2
+
+    def mean_time_per_move(self) -> tuple[float, float]:
+        """ mean thinking time per move in milliseconds of player a and player b """
+        return float(np.mean(self.times_a)) if self.times_a else 0., float(np.mean(self.times_b)) if self.times_b else 0.
+
+    def add(self, game: GameResult) -> None:
+        if game.score == 1:
+            self.wins += 1
+        elif game.score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+        self.times_a += game.times_a
+        self.times_b += game.times_b
+        return None
+
+    def summary(self) -> str:
+        elo, error = self.elo()
+        time_a, time_b = self.mean_time_per_move()
+        return (f'+{self.wins} ={self.draws} -{self.losses} ({self.score:.3f}), '
+                f'elo {elo:+.1f} +/- {error:.1f}, ms per move {time_a:.0f} / {time_b:.0f}')
+
+
+def _elo(score: float) -> float:
+    if score <= 0:
+        return -math.inf
+    if score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+def random_opening(plies: int, seed: int) -> list[chess.Move]:
+    """ a random sequence of legal moves from the starting position
+    Takes:
+        - plies: (int) the number of half moves to play
+        - seed: (int) the seed of the random number generator
+    """
+    rng: np.random.Generator = np.random.default_rng(seed)
+    board = chess.Board()
+    for _ in range(plies):
+        moves: list[chess.Move] = list(board.legal_moves)
+        if not moves:
+            break
+        board.push(moves[rng.integers(len(moves))])
+    return board.move_stack
+
+
+def play_game(player_a: type[BasePlayer], player_b: type[BasePlayer], a_white: bool = True, *,
+              args_a: dict | None = None, args_b: dict | None = None, opening: list[chess.Move] | None = None,
+              time_ms: int = 60_000, increment: int = 0, max_plies: int = 400, round_number: int = 1) -> GameResult:
+    """ play one game between two players without any user interface
+    Takes:
+        - player_a: (PlayerType) the class of the first player
+        - player_b: (PlayerType) the class of the second player
+        - a_white: (bool) whether player a has the white pieces
+        - args_a: (optional dict) extra arguments to give to player a
+        - args_b: (optional dict) extra arguments to give to player b
+        - opening: (optional list) moves played before the players take over
+        - time_ms: (int) the time on each clock in milliseconds
+        - increment: (int) the increment per move in milliseconds
+        - max_plies: (int) the game is adjudicated a draw after this many half moves
+        - round_number: (int) the round written to the pgn headers
+    """
+    colors: dict[bool, bool] = {True: a_white, False: not a_white}
+    players: dict[bool, BasePlayer] = {
+        colors[True]: player_a(color=colors[True], **({} if args_a is None else args_a)),
+        colors[False]: player_b(color=colors[False], **({} if args_b is None else args_b)),
+    }
+    clocks: dict[bool, int] = {chess.WHITE: time_ms, chess.BLACK: time_ms}
+    times: dict[bool, list[int]] = {chess.WHITE: [], chess.BLACK: []}
+    board = chess.Board()
+    for move in opening or []:
+        board.push(move)
+
+    result: str | None = None
+    termination: str = 'normal'
+    while not board.is_game_over(claim_draw=True) and board.ply() < max_plies:
+        turn: bool = board.turn
+        t0 = time.perf_counter()
+        move: chess.Move | None = players[turn].choose_move(board.copy(), clocks[turn], increment=increment)
+        spent: int = int((time.perf_counter() - t0) * 1000)
+        times[turn].append(spent)
+        clocks[turn] -= spent
+        if clocks[turn] <= 0:
+            result, termination = ('0-1' if turn else '1-0'), 'time forfeit'
+            break
+        if move is None or not board.is_legal(move):
+            result, termination = ('0-1' if turn else '1-0'), 'rules infraction'
+            break
+        clocks[turn] += increment
+        board.push(move)
+    for player in players.values():
+        if hasattr(player, 'close'):
+            player.close()
+
+    if result is None:
+        outcome: chess.Outcome | None = board.outcome(claim_draw=True)
+        result = '1/2-1/2' if outcome is None else outcome.result()
+        termination = 'adjudication' if outcome is None else termination
+
+    game = chess.pgn.Game.from_board(board)
+    game.headers['Event'] = 'schmittie_chess match'
+    game.headers['Round'] = str(round_number)
+    game.headers['White'] = (player_a if a_white else player_b).__name__
+    game.headers['Black'] = (player_b if a_white else player_a).__name__
+    game.headers['Result'] = result
+    game.headers['TimeControl'] = f'{time_ms // 1000}+{increment / 1000:g}'
+    game.headers['Termination'] = termination
+    white_score: float = {'1-0': 1., '0-1': 0.}.get(result, 0.5)
+    return GameResult(pgn=str(game), score=white_score if a_white else 1 - white_score, a_white=a_white,
+                      times_a=times[colors[True]], times_b=times[colors[False]])
+
+
+def run_match(player_a: type[BasePlayer], player_b: type[BasePlayer], n_games: int = 10, *,
+              args_a: dict | None = None, args_b: dict | None = None, n_workers: int = 1,
+              time_ms: int = 60_000, increment: int = 0, opening_plies: int = 4, max_plies: int = 400,
+              seed: int = 1337, pgn_path: str | None = None) -> MatchResult:
+    """ play a match of n_games between two players across a pool of processes. Games are played
+    in pairs on the same random opening with the colors swapped.
+    Takes:
+        - player_a: (PlayerType) the class of the first player, e.g. PlayerMiniMax
+        - player_b: (PlayerType) the class of the second player, e.g. BasePlayer
+        - n_games: (int) the number of games to play
+        - args_a: (optional dict) extra arguments to give to player a
+        - args_b: (optional dict) extra arguments to give to player b
+        - n_workers: (int) the number of processes playing games at the same time
+        - time_ms: (int) the time on each clock in milliseconds
+        - increment: (int) the increment per move in milliseconds
+        - opening_plies: (int) the number of random half moves played before the players take over
+        - max_plies: (int) games are adjudicated a draw after this many half moves
+        - seed: (int) the seed of the random openings
+        - pgn_path: (optional str) file the pgns of all games are written to
+    """
+    logger = logging.getLogger(__name__)
+    result = MatchResult()
+    pgn_file = None if pgn_path is None else open(pgn_path, 'w')
+    try:
+        for game in _play_games(player_a, player_b, n_games, args_a, args_b, n_workers, time_ms,
+                                increment, opening_plies, max_plies, seed):
+            result.add(game)
+            logger.info(f'Game {result.games}/{n_games}: {result.summary()}')
+            if pgn_file is not None:
+                pgn_file.write(game.pgn + '\n\n')
+                pgn_file.flush()
+    finally:
+        if pgn_file is not None:
+            pgn_file.close()
+    return result
+
+
+def _play_games(player_a: type[BasePlayer], player_b: type[BasePlayer], n_games: int, args_a: dict | None,
+                args_b: dict | None, n_workers: int, time_ms: int, increment: int, opening_plies: int,
+                max_plies: int, seed: int) -> Iterator[GameResult]:
+    jobs: list[dict] = [dict(player_a=player_a, player_b=player_b, a_white=not game % 2, args_a=args_a,
+                             args_b=args_b, opening=random_opening(opening_plies, seed + game // 2),
+                             time_ms=time_ms, increment=increment, max_plies=max_plies, round_number=game + 1)
+                        for game in range(n_games)]
+    if n_workers < 2:
+        for job in jobs:
+            yield play_game(**job)
+        return None
+    with ProcessPoolExecutor(n_workers, mp_context=mp.get_context('spawn')) as pool:
+        futures = [pool.submit(play_game, **job) for job in jobs]
+        for future in futures:
+            yield future.result()
+    return None
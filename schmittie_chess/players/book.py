@@ -0,0 +1,57 @@
+import numpy as np
+import logging
+import chess
+import chess.polyglot
+
+
+class OpeningBook:
+    """ polyglot opening book. The file is memory mapped on the first lookup and searched by
+    bisection on the zobrist key, so neither building the book nor looking up a position reads
+    more of it than the few entries of that position. """
+    def __init__(self, path: str, max_ply: int | None = None) -> None:
+        """ Initialiser of the OpeningBook
+        Takes:
+            - path: (str) the polyglot .bin file
+            - max_ply: (optional int) the book is not consulted after this many half moves
+        """
+        self.path: str = path
+        self.max_ply: int | None = max_ply
+        self.logger = logging.getLogger('OpeningBook')
+        self._reader: chess.polyglot.MemoryMappedReader | None = None
+        self._failed: bool = False
+        return None
+
+    def _open(self) -> chess.polyglot.MemoryMappedReader | None:
+        if self._reader is None and not self._failed:
+            try:
+                self._reader = chess.polyglot.open_reader(self.path)
+            except OSError as error:
+                # - a missing book is not worth losing the game over, search instead
+                self.logger.warning(f'Could not open opening book {self.path}: {error}')
+                self._failed = True
+        return self._reader
+
+    def choose(self, state: chess.Board, rng: np.random.Generator) -> chess.Move | None:
+        """ a book move of the position picked with probability proportional to its weight,
+        None if the position is not in the book
+        Takes:
+            - state: (chess.Board) the position to look up
+            - rng: (np.random.Generator) the random number generator of the player
+        """
+        if self.max_ply is not None and state.ply() >= self.max_ply:
+            return None
+        reader = self._open()
+        if reader is None:
+            return None
+        entries: list[chess.polyglot.Entry] = list(reader.find_all(state))
+        if not entries:
+            return None
+        # - entries of weight zero are already left out by the reader
+        weights: np.ndarray = np.array([entry.weight for entry in entries], dtype=float)
+        return entries[rng.choice(len(entries), p=weights / weights.sum())].move
+
+    def close(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        return None
@@ -0,0 +1,156 @@
+from ..config import const
+from chess import engine
+import threading
+import asyncio
+import logging
+import atexit
+import chess
+
+
+class EnginePool:
+    """ pool of uci engine processes driven through the asyncio api of python-chess. The event loop
+    runs in a background thread, so that the blocking play() can be called from any thread. Processes
+    are started on demand, up to size, and reused for every following search, whichever player or
+    game it belongs to. At most size searches run at the same time, further ones wait for a free engine. """
+    def __init__(self, command: str | list[str] | None = None, size: int = 1, options: dict | None = None) -> None:
+        """ Initialiser of the EnginePool
+        Takes:
+            - command: (optional str or list) the engine binary and its arguments, defaults to const.STOCKFISH
+            - size: (int) the most engine processes, and so searches, running at the same time
+            - options: (optional dict) uci options every engine is configured with, e.g. {'Threads': 1}
+        """
+        self.logger = logging.getLogger('EnginePool')
+        self.command: str | list[str] = const.STOCKFISH if command is None else command
+        self.size: int = max(1, size)
+        self.options: dict = {} if options is None else dict(options)
+        self.spawned: int = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='engine-pool', daemon=True)
+        self._thread.start()
+        self._idle: asyncio.Queue | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._engines: list[engine.UciProtocol] = []
+        # - per engine the game key, root fen and moves of its last search
+        self._games: dict[engine.UciProtocol, tuple[object, str, list[chess.Move]]] = {}
+        self._closed: bool = False
+        return None
+
+    def play(self, state: chess.Board, limit: engine.Limit, *, game: object = None, **kwargs) -> engine.PlayResult:
+        """ let one of the engines play a move, blocks until it did
+        Takes:
+            - state: (chess.Board) the position, the move stack is sent along
+            - limit: (engine.Limit) when the engine has to stop thinking
+            - game: (optional object) key of the game the position belongs to, an engine that last searched 
+                    a different game is sent ucinewgame first. By default a position is taken to be of the same
+                    game if it continues the moves the engine searched last
+            - kwargs: further arguments to engine.Protocol.play
+        """
+        if self._closed:
+            raise RuntimeError('The engine pool is shut down')
+        return asyncio.run_coroutine_threadsafe(self._play(state, limit, game, **kwargs), self._loop).result()
+
+    async def _play(self, state: chess.Board, limit: engine.Limit, game: object, **kwargs) -> engine.PlayResult:
+        if self._slots is None:
+            # - created on the loop they are used on
+            self._slots, self._idle = asyncio.Semaphore(self.size), asyncio.Queue()
+        async with self._slots:
+            protocol: engine.UciProtocol = await self._acquire()
+            if game is None:
+                game = self._game_of(protocol, state)
+            finished: bool = False
+            try:
+                result: engine.PlayResult = await protocol.play(state, limit, game=game, **kwargs)
+                finished = True
+            finally:
+                if finished:
+                    self._idle.put_nowait(protocol)  # type: ignore[union-attr]
+                else:
+                    # - a crashed, misbehaving or interrupted engine is dropped whatever went wrong,
+                    #   the next search starts a new one instead of waiting for it forever
+                    self._engines.remove(protocol)
+                    self._games.pop(protocol, None)
+                    await self._quit(protocol)
+            return result
+
+    def _game_of(self, protocol: engine.UciProtocol, state: chess.Board) -> object:
+        """ the game key of a position, the one of the last search of the engine if the position follows from it """
+        root: str = state.root().fen()
+        moves: list[chess.Move] = state.move_stack
+        last = self._games.get(protocol)
+        if last is not None and last[1] == root and moves[:len(last[2])] == last[2]:
+            game: object = last[0]
+        else:
+            game = object()
+        self._games[protocol] = (game, root, list(moves))
+        return game
+
+    async def _acquire(self) -> engine.UciProtocol:
+        """ an idle engine, a new one is started if all engines started so far are busy """
+        if not self._idle.empty() or len(self._engines) >= self.size:  # type: ignore[union-attr]
+            return await self._idle.get()  # type: ignore[union-attr]
+        self.logger.debug(f'Starting engine {self.command}')
+        _, protocol = await engine.popen_uci(self.command)
+        if self.options:
+            await protocol.configure(self.options)
+        self._engines.append(protocol)
+        self.spawned += 1
+        return protocol
+
+    async def _quit(self, protocol: engine.UciProtocol) -> None:
+        try:
+            await asyncio.wait_for(protocol.quit(), 5)
+        except (engine.EngineError, asyncio.TimeoutError, OSError):
+            try:
+                protocol.transport.kill()  # type: ignore[attr-defined]
+            except OSError:
+                # - the process is gone already
+                pass
+        return None
+
+    async def _shutdown(self) -> None:
+        # - one engine failing to quit does not keep the others running
+        await asyncio.gather(*(self._quit(protocol) for protocol in self._engines), return_exceptions=True)
+        self._engines.clear()
+        self._games.clear()
+        return None
+
+    def close(self) -> None:
+        """ quit all engine processes and stop the event loop """
+        if self._closed:
+            return None
+        self._closed = True
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        return None
+
+
+# - pools shared by every player of the process, keyed by command and size
+_POOLS: dict[tuple[str, int], EnginePool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(command: str | list[str] | None = None, size: int = 1, options: dict | None = None) -> EnginePool:
+    """ the shared pool of an engine, started on first use and shut down when the process exits
+    Takes:
+        - command: (optional str or list) the engine binary and its arguments, defaults to const.STOCKFISH
+        - size: (int) the most engine processes of the pool
+        - options: (optional dict) uci options of the engines, only used when the pool is created
+    """
+    command = const.STOCKFISH if command is None else command
+    key: tuple[str, int] = (command if isinstance(command, str) else ' '.join(command), size)
+    with _POOLS_LOCK:
+        if key not in _POOLS or _POOLS[key]._closed:
+            _POOLS[key] = EnginePool(command, size, options)
+        return _POOLS[key]
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    """ quit the engines of all shared pools """
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
+    return None
@@ -0,0 +1,223 @@
+from ..config import const
+from .position import SearchPosition
+import numpy as np
+import chess
+
+
+def _from_ranks(ranks: list[list[int]]) -> list[float]:
+    # - tables are written rank 8 first to read like a board, in centipawns
+    return [value / 100 for rank in reversed(ranks) for value in rank]
+
+
+# - piece-square tables in pawns from the point of view of white, indexed [piece_type][square]
+#   with a1 = 0, black looks them up on the vertically mirrored square.
+#   Values are the 'simplified evaluation function' tables of Tomasz Michniewski.
+SIMPLE_PST: np.ndarray = np.array([
+    [0.] * 64,
+    _from_ranks([[0, 0, 0, 0, 0, 0, 0, 0],
+                 [50, 50, 50, 50, 50, 50, 50, 50],
+                 [10, 10, 20, 30, 30, 20, 10, 10],
+                 [5, 5, 10, 25, 25, 10, 5, 5],
+                 [0, 0, 0, 20, 20, 0, 0, 0],
+                 [5, -5, -10, 0, 0, -10, -5, 5],
+                 [5, 10, 10, -20, -20, 10, 10, 5],
+                 [0, 0, 0, 0, 0, 0, 0, 0]]),
+    _from_ranks([[-50, -40, -30, -30, -30, -30, -40, -50],
+                 [-40, -20, 0, 0, 0, 0, -20, -40],
+                 [-30, 0, 10, 15, 15, 10, 0, -30],
+                 [-30, 5, 15, 20, 20, 15, 5, -30],
+                 [-30, 0, 15, 20, 20, 15, 0, -30],
+                 [-30, 5, 10, 15, 15, 10, 5, -30],
+                 [-40, -20, 0, 5, 5, 0, -20, -40],
+                 [-50, -40, -30, -30, -30, -30, -40, -50]]),
+    _from_ranks([[-20, -10, -10, -10, -10, -10, -10, -20],
+                 [-10, 0, 0, 0, 0, 0, 0, -10],
+                 [-10, 0, 5, 10, 10, 5, 0, -10],
+                 [-10, 5, 5, 10, 10, 5, 5, -10],
+                 [-10, 0, 10, 10, 10, 10, 0, -10],
+                 [-10, 10, 10, 10, 10, 10, 10, -10],
+                 [-10, 5, 0, 0, 0, 0, 5, -10],
+                 [-20, -10, -10, -10, -10, -10, -10, -20]]),
+    _from_ranks([[0, 0, 0, 0, 0, 0, 0, 0],
+                 [5, 10, 10, 10, 10, 10, 10, 5],
+                 [-5, 0, 0, 0, 0, 0, 0, -5],
+                 [-5, 0, 0, 0, 0, 0, 0, -5],
+                 [-5, 0, 0, 0, 0, 0, 0, -5],
+                 [-5, 0, 0, 0, 0, 0, 0, -5],
+                 [-5, 0, 0, 0, 0, 0, 0, -5],
+                 [0, 0, 0, 5, 5, 0, 0, 0]]),
+    _from_ranks([[-20, -10, -10, -5, -5, -10, -10, -20],
+                 [-10, 0, 0, 0, 0, 0, 0, -10],
+                 [-10, 0, 5, 5, 5, 5, 0, -10],
+                 [-5, 0, 5, 5, 5, 5, 0, -5],
+                 [0, 0, 5, 5, 5, 5, 0, -5],
+                 [-10, 5, 5, 5, 5, 5, 0, -10],
+                 [-10, 0, 5, 0, 0, 0, 0, -10],
+                 [-20, -10, -10, -5, -5, -10, -10, -20]]),
+    _from_ranks([[-30, -40, -40, -50, -50, -40, -40, -30],
+                 [-30, -40, -40, -50, -50, -40, -40, -30],
+                 [-30, -40, -40, -50, -50, -40, -40, -30],
+                 [-30, -40, -40, -50, -50, -40, -40, -30],
+                 [-20, -30, -30, -40, -40, -30, -30, -20],
+                 [-10, -20, -20, -20, -20, -20, -20, -10],
+                 [20, 20, 0, 0, 0, 0, 20, 20],
+                 [20, 30, 10, 0, 0, 10, 30, 20]]),
+])
+
+
+def bitboards(state: chess.Board) -> tuple[int, ...]:
+    """ the twelve piece bitboards of a board in the order of pack_boards """
+    white, black = state.occupied_co[chess.WHITE], state.occupied_co[chess.BLACK]
+    pawns, knights, bishops, rooks, queens, kings = (state.pawns, state.knights, state.bishops, 
+                                                     state.rooks, state.queens, state.kings)
+    return (pawns & white, knights & white, bishops & white, rooks & white, queens & white, kings & white,
+            pawns & black, knights & black, bishops & black, rooks & black, queens & black, kings & black)
+
+
+def pack_boards(states: list[chess.Board]) -> np.ndarray:
+    """ stack the piece bitboards of many boards into an array of shape (n, 12), the white pieces
+    pawn to king come first and the black pieces after, bit i of a bitboard is square i
+    Takes:
+        - states: (list[chess.Board]) the boards to pack
+    """
+    rows: list[tuple[int, ...]] = [bitboards(state) for state in states]
+    return np.array(rows, dtype=np.uint64).reshape(-1, 12)
+
+
+def position_bitboards(position: SearchPosition) -> tuple[int, ...]:
+    """ the twelve piece bitboards of a SearchPosition in the order of pack_boards """
+    _, pawns, knights, bishops, rooks, queens, kings = position.pieces
+    black, white = position.occupied_co
+    return (pawns & white, knights & white, bishops & white, rooks & white, queens & white, kings & white,
+            pawns & black, knights & black, bishops & black, rooks & black, queens & black, kings & black)
+
+
+def pack_positions(positions: list[SearchPosition | tuple[int, ...]]) -> np.ndarray:
+    """ pack_boards for the positions of the search. A SearchPosition changes in place while moves 
+    are made, a search batching its leaves therefore collects their position_bitboards as it 
+    reaches them and packs those, rows that are already tuples are taken as they are
+    Takes:
+        - positions: (list) SearchPositions or the position_bitboards of them to pack
+    """
+    rows: list[tuple[int, ...]] = [row if isinstance(row, tuple) else position_bitboards(row) for row in positions]
+    return np.array(rows, dtype=np.uint64).reshape(-1, 12)
+
+
+def material(state: chess.Board, color: bool = True) -> float:
+    """ material balance of a board from the point of view of color, based on bitboard popcounts
+    Takes:
+        - state: (chess.Board) the board to count the material of
+        - color: (bool) the side for which the balance is positive
+    """
+    value: float = 0.
+    for piece_type in const.PIECES:
+        balance: int = (chess.popcount(state.pieces_mask(piece_type, color))
+                        - chess.popcount(state.pieces_mask(piece_type, not color)))
+        value += const.VALUE_HASH[piece_type] * balance
+    return value
+
+
+class Evaluator:
+    """ material and piece-square evaluation, updated incrementally while moves are made and
+    unmade during the search instead of being recomputed at every leaf. With zeroed piece-square
+    tables it returns exactly the material balance of `material`. """
+    def __init__(self, values: dict[int, float] | None = None, pst: np.ndarray | None = None) -> None:
+        """ Initialiser of the Evaluator
+        Takes:
+            - values: (optional dict) value of each piece type, defaults to const.VALUE_HASH
+            - pst: (optional array) piece-square tables of shape (7, 64) indexed by piece type
+                   and square as seen from white, e.g. SIMPLE_PST. Defaults to all zeros.
+        """
+        self.values: dict[int, float] = dict(const.VALUE_HASH if values is None else values)
+        self.pst: np.ndarray = np.zeros((7, 64)) if pst is None else np.asarray(pst, dtype=float)
+        # - signed square tables per color, white positive
+        self._tables: dict[bool, list[list[float]]] = {
+            chess.WHITE: [[float(v) for v in row] for row in self.pst],
+            chess.BLACK: [[-float(row[square ^ 56]) for square in chess.SQUARES] for row in self.pst],
+        }
+        # - the same tables for whole batches, rows ordered like pack_boards
+        self._piece_values: np.ndarray = np.array([self.values[pt] for pt in const.PIECES] * 2) * np.repeat([1, -1], 6)
+        self._square_weights: np.ndarray = np.array([self._tables[color][pt] for color in (chess.WHITE, chess.BLACK) 
+                                                     for pt in const.PIECES]) + self._piece_values[:, None]
+        # - running totals: count difference white minus black per piece type and piece-square sum
+        self._balance: tuple[int, ...] = (0,) * 7
+        self._pst: float = 0.
+        self._stack: list[tuple[tuple[int, ...], float]] = []
+        return None
+
+    def reset(self, position: SearchPosition) -> None:
+        """ recompute the running totals from scratch for the given position """
+        balance: list[int] = [0] * 7
+        pst: float = 0.
+        for piece_type in const.PIECES:
+            for color in (chess.WHITE, chess.BLACK):
+                mask: int = position.pieces_mask(piece_type, color)
+                balance[piece_type] += chess.popcount(mask) if color else -chess.popcount(mask)
+                table: list[float] = self._tables[color][piece_type]
+                for square in chess.scan_forward(mask):
+                    pst += table[square]
+        self._balance = tuple(balance)
+        self._pst = pst
+        self._stack.clear()
+        return None
+
+    def push(self, position: SearchPosition, move: int) -> None:
+        """ update the totals for move and push it on the position, 0 is a null move """
+        self._stack.append((self._balance, self._pst))
+        if not move:
+            # - null move, nothing changes on the board
+            position.push(move)
+            return None
+        removed, added = position.piece_changes(move)
+        tables: dict[bool, list[list[float]]] = self._tables
+        pst: float = self._pst
+        for color, piece_type, square in added:
+            pst += tables[color][piece_type][square]
+        for color, piece_type, square in removed:
+            pst -= tables[color][piece_type][square]
+        if len(removed) != len(added) or move >> 12:
+            # - only captures and promotions change the material
+            balance: list[int] = list(self._balance)
+            for color, piece_type, _ in added:
+                balance[piece_type] += 1 if color else -1
+            for color, piece_type, _ in removed:
+                balance[piece_type] -= 1 if color else -1
+            self._balance = tuple(balance)
+        self._pst = pst
+        position.push(move)
+        return None
+
+    def pop(self, position: SearchPosition) -> int:
+        """ pop the last move from the position and restore the totals from before it """
+        self._balance, self._pst = self._stack.pop()
+        return position.pop()
+
+    def evaluate(self, color: bool = True) -> float:
+        """ score of the current position from the point of view of color """
+        value: float = 0.
+        for piece_type in const.PIECES:
+            value += self.values[piece_type] * self._balance[piece_type]
+        value += self._pst
+        return value if color else -value
+
+    def evaluate_batch(self, packed: np.ndarray, color: bool = True, chunk: int = 4096) -> np.ndarray:
+        """ scores of many positions at once, the same as evaluate would give for each of them
+        Takes:
+            - packed: (array) piece bitboards of shape (n, 12) as made by pack_boards or pack_positions
+            - color: (bool) the side for which the scores are positive
+            - chunk: (int) the number of positions unpacked at a time, bounds the memory used
+        """
+        packed = np.ascontiguousarray(packed, dtype='<u8').reshape(-1, 12)
+        if not self.pst.any() and hasattr(np, 'bitwise_count'):
+            # - material only, popcounts are all that is needed. Balances are taken per piece type
+            #   first so that the kings cancel exactly like they do in evaluate
+            counts: np.ndarray = np.bitwise_count(packed).astype(np.int64)
+            scores: np.ndarray = (counts[:, :6] - counts[:, 6:]) @ self._piece_values[:6]
+        else:
+            scores = np.empty(len(packed))
+            weights: np.ndarray = self._square_weights.reshape(-1)
+            for start in range(0, len(packed), chunk):
+                # - little endian bytes, so bit i of the unpacked row is square i
+                squares: np.ndarray = np.unpackbits(packed[start:start + chunk].view(np.uint8), axis=-1, bitorder='little')
+                scores[start:start + chunk] = squares @ weights
+        return scores if color else -scores
@@ -0,0 +1,117 @@
+from ..config import const
+from .position import SearchPosition
+import numpy as np
+import chess
+
+
+# - one input per color, piece type and square, seen from one of the two sides
+N_FEATURES: int = 2 * 6 * 64
+
+
+def feature(perspective: bool, color: bool, piece_type: int, square: int) -> int:
+    """ index of a piece in the input of the network as seen from perspective. Pieces of the
+    perspective come first and the board is mirrored for black, so both sides share the weights. """
+    if not perspective:
+        square ^= 56
+    return ((color != perspective) * 6 + piece_type - 1) * 64 + square
+
+
+class NNUEEvaluator:
+    """ small efficiently updatable neural network evaluation. The first layer, by far the largest,
+    is kept as an accumulator per side that moves only add and subtract a few weight rows from,
+    the small dense head on top is evaluated at the leaves. A drop-in for Evaluator:
+    reset, push, pop and evaluate are called the same way by the search. """
+    def __init__(self, ft_weight: np.ndarray, ft_bias: np.ndarray, l1_weight: np.ndarray, l1_bias: np.ndarray,
+                 out_weight: np.ndarray, out_bias: np.ndarray, scale: float = 1.,
+                 values: dict[int, float] | None = None) -> None:
+        """ Initialiser of the NNUEEvaluator
+        Takes:
+            - ft_weight: (array) feature transformer of shape (768, n_hidden)
+            - ft_bias: (array) bias of the feature transformer of shape (n_hidden,)
+            - l1_weight: (array) hidden layer of shape (2 * n_hidden, n_l1), fed with the accumulator
+                         of the side to score first and the other side second
+            - l1_bias: (array) bias of the hidden layer of shape (n_l1,)
+            - out_weight: (array) output layer of shape (n_l1,)
+            - out_bias: (array) bias of the output layer, a scalar
+            - scale: (float) factor from the output of the network to pawns
+            - values: (optional dict) value of each piece type, the search still uses these to prune
+                      captures. Defaults to const.VALUE_HASH
+        """
+        self.ft_weight: np.ndarray = np.asarray(ft_weight, dtype=np.float32)
+        self.ft_bias: np.ndarray = np.asarray(ft_bias, dtype=np.float32)
+        self.l1_weight: np.ndarray = np.asarray(l1_weight, dtype=np.float32)
+        self.l1_bias: np.ndarray = np.asarray(l1_bias, dtype=np.float32)
+        self.out_weight: np.ndarray = np.asarray(out_weight, dtype=np.float32)
+        self.out_bias: float = float(out_bias)
+        self.scale: float = scale
+        self.values: dict[int, float] = dict(const.VALUE_HASH if values is None else values)
+        if self.ft_weight.shape[0] != N_FEATURES or self.l1_weight.shape[0] != 2 * self.ft_weight.shape[1]:
+            raise ValueError(f'Network shapes do not fit: {self.ft_weight.shape} and {self.l1_weight.shape}')
+        # - accumulators of white and black, indexed by color
+        self._accumulator: np.ndarray = np.zeros((2, self.ft_weight.shape[1]), dtype=np.float32)
+        self._stack: list[np.ndarray] = []
+        return None
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'NNUEEvaluator':
+        """ read the weights from an npz file with one array per argument of the initialiser """
+        with np.load(path) as weights:
+            arrays: dict[str, np.ndarray] = {name: weights[name] for name in weights.files}
+        if 'scale' in arrays:
+            kwargs.setdefault('scale', float(arrays.pop('scale')))
+        return cls(**arrays, **kwargs)
+
+    @classmethod
+    def random(cls, n_hidden: int = 128, n_l1: int = 32, seed: int = 1337, **kwargs) -> 'NNUEEvaluator':
+        """ untrained network of the given size, plays nonsense but costs the same as a trained one """
+        rng = np.random.default_rng(seed)
+        return cls(rng.normal(0, 0.1, (N_FEATURES, n_hidden)), np.zeros(n_hidden),
+                   rng.normal(0, 1 / np.sqrt(2 * n_hidden), (2 * n_hidden, n_l1)), np.zeros(n_l1),
+                   rng.normal(0, 1 / np.sqrt(n_l1), n_l1), 0., **kwargs)
+
+    def save(self, path: str) -> None:
+        np.savez(path, ft_weight=self.ft_weight, ft_bias=self.ft_bias, l1_weight=self.l1_weight,
+                 l1_bias=self.l1_bias, out_weight=self.out_weight, out_bias=self.out_bias, scale=self.scale)
+        return None
+
+    def reset(self, position: SearchPosition) -> None:
+        """ recompute the accumulators from scratch for the given position """
+        for perspective in (chess.WHITE, chess.BLACK):
+            active: list[int] = [feature(perspective, color, piece_type, square)
+                                 for color in (chess.WHITE, chess.BLACK) for piece_type in chess.PIECE_TYPES
+                                 for square in chess.scan_forward(position.pieces_mask(piece_type, color))]
+            self._accumulator[int(perspective)] = self.ft_bias + self.ft_weight[active].sum(axis=0)
+        self._stack.clear()
+        return None
+
+    def push(self, position: SearchPosition, move: int) -> None:
+        """ update the accumulators for move and push it on the position, 0 is a null move """
+        self._stack.append(self._accumulator)
+        if not move:
+            position.push(move)
+            return None
+        removed, added = position.piece_changes(move)
+        # - a new array, the one on the stack is restored as is on pop
+        accumulator: np.ndarray = self._accumulator.copy()
+        for perspective in (chess.WHITE, chess.BLACK):
+            # - rows are indexed by integer, a bool would be taken as a mask by numpy
+            row: np.ndarray = accumulator[int(perspective)]
+            for color, pt, square in added:
+                row += self.ft_weight[feature(perspective, color, pt, square)]
+            for color, pt, square in removed:
+                row -= self.ft_weight[feature(perspective, color, pt, square)]
+        self._accumulator = accumulator
+        position.push(move)
+        return None
+
+    def pop(self, position: SearchPosition) -> int:
+        """ pop the last move from the position and restore the accumulators from before it """
+        self._accumulator = self._stack.pop()
+        return position.pop()
+
+    def evaluate(self, color: bool = True) -> float:
+        """ score of the current position from the point of view of color """
+        # - clipped relu on both accumulators, the side to score first
+        hidden: np.ndarray = np.clip(np.concatenate((self._accumulator[int(color)], self._accumulator[int(not color)])), 0., 1.)
+        hidden = np.clip(hidden @ self.l1_weight + self.l1_bias, 0., 1.)
+        return float(hidden @ self.out_weight + self.out_bias) * self.scale
@@ -0,0 +1,103 @@
+from .position import SearchPosition
+from typing import Iterator
+import chess
+
+
+class MoveOrderer:
+    """ staged move ordering for the search: hash move, captures by MVV-LVA, killer moves
+    and quiet moves by the history heuristic. Moves are the codes of transposition.encode_move,
+    the captures are only sorted once the hash move did not cause a cutoff and the quiet moves
+    only once the captures and killers did not. """
+    def __init__(self, max_ply: int = 64, n_killers: int = 2) -> None:
+        """ Initialiser of the MoveOrderer
+        Takes:
+            - max_ply: (int) the number of plies from the root that keep killer moves
+            - n_killers: (int) the number of killer moves kept per ply
+        """
+        self.max_ply: int = max_ply
+        self.n_killers: int = n_killers
+        self.killers: list[list[int]] = [[] for _ in range(max_ply)]
+        # - indexed by color * 4096 + to square * 64 + from square, the low 12 bits of a move code
+        self.history: list[int] = [0] * (2 * 64 * 64)
+        return None
+
+    def new_search(self) -> None:
+        """ forget the killer moves and age the history of the previous search """
+        for killers in self.killers:
+            killers.clear()
+        self.history = [value // 2 for value in self.history]
+        return None
+
+    def store_cutoff(self, position: SearchPosition, move: int, depth: int, ply: int) -> None:
+        """ remember a quiet move that caused a beta cutoff
+        Takes:
+            - position: (SearchPosition) the position before the move is made
+            - move: (int) the code of the move causing the cutoff
+            - depth: (int) the remaining depth of the node, deeper cutoffs weigh more
+            - ply: (int) the distance of the node from the root
+        """
+        if position.is_capture(move):
+            return None
+        if ply < self.max_ply:
+            killers: list[int] = self.killers[ply]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[self.n_killers:]
+        self.history[position.turn * 4096 + (move & 4095)] += depth * depth
+        return None
+
+    def captures(self, position: SearchPosition, moves: list[int] | None = None, exclude: int = 0) -> list[int]:
+        """ legal captures of position sorted by most valuable victim and least valuable attacker
+        Takes:
+            - position: (SearchPosition) the position to generate the captures for
+            - moves: (optional list[int]) the legal moves of position if they are known already
+            - exclude: (int) a move that was already searched, 0 for none
+        """
+        if moves is None:
+            captures: list[int] = position.legal_captures()
+        else:
+            captures = [move for move in moves if position.is_capture(move)]
+        if exclude in captures:
+            captures.remove(exclude)
+        squares: list[int] = position.squares
+        # - en passant captures land on an empty square, their victim is a pawn
+        captures.sort(key=lambda move: (squares[move >> 6 & 63] or chess.PAWN) * 8 - squares[move & 63], reverse=True)
+        return captures
+
+    def moves(self, position: SearchPosition, moves: list[int] | None = None, hash_move: int = 0,
+              ply: int = 0) -> Iterator[int]:
+        """ yield the legal moves of position, the ones most likely to cause a cutoff first
+        Takes:
+            - position: (SearchPosition) the position to order the moves of
+            - moves: (optional list[int]) the legal moves of position if they are known already
+            - hash_move: (int) best move from the transposition table, 0 for none
+            - ply: (int) the distance of the node from the root, for the killer moves
+        """
+        if moves is None:
+            moves = position.legal_moves()
+        # - stage 1: the hash move, checked for legality since keys may collide
+        if hash_move and hash_move in moves:
+            yield hash_move
+        else:
+            hash_move = 0
+
+        # - stage 2: captures, most valuable victim first, least valuable attacker second
+        is_capture = position.is_capture
+        quiets: list[int] = [move for move in moves if not is_capture(move)]
+        if len(quiets) < len(moves):
+            yield from self.captures(position, [move for move in moves if is_capture(move)], hash_move)
+
+        # - stage 3: quiet moves that caused cutoffs in sibling nodes
+        if hash_move in quiets:
+            quiets.remove(hash_move)
+        if ply < self.max_ply:
+            for killer in self.killers[ply]:
+                if killer in quiets:
+                    quiets.remove(killer)
+                    yield killer
+
+        # - stage 4: remaining quiet moves ordered by how often they caused cutoffs
+        offset: int = position.turn * 4096
+        history: list[int] = self.history
+        quiets.sort(key=lambda move: (move >> 12, history[offset + (move & 4095)]), reverse=True)
+        yield from quiets
@@ -1,4 +1,5 @@
-from ..config import const
+from .evaluation import material
+from .engine_pool import EnginePool, get_pool
 from chess import engine
 import time
 import chess
@@ -11,10 +12,11 @@ class BasePlayer:
         self.rng: np.random.Generator = np.random.default_rng(seed=seed)
         self.color: bool = color
         self.auto = True
+        self.pondering: bool = False
         return None
     
     def choose_move(self, state: chess.Board, time_left: int, *, 
-                    move_fraction: float = 0.2) -> chess.Move:
+                    move_fraction: float = 0.2, increment: int = 0) -> chess.Move:
         """ choose a move to be made based on objective """
         t0 = time.time()
         time.sleep(1)
@@ -25,18 +27,22 @@ class BasePlayer:
             return legal_moves[best_move]
         return legal_moves[best_move]
     
-    def value_function(self, state: chess.Board) -> float:
-        """ value function that assigns a weight based on the current board state """
-        value: float = 0.
+    def stop(self) -> None:
+        """ ask a running choose_move to return early, players that can not be interrupted ignore it """
+        return None
 
-        for i in range(const.COLS * const.ROWS):
-            piece: chess.Piece | None = state.piece_at(i)
-            if piece is None:
-                continue
-            val = const.VALUE_HASH[piece.piece_type] 
-            value = value + val if piece.color else value - val
+    def prepare_search(self) -> None:
+        """ called when a choose_move or ponder is handed to another thread, a stop() from then on 
+        applies to that search even if it comes before the search started """
+        return None
 
-        return value if self.color else -1 * value
+    def ponder(self, state: chess.Board) -> None:
+        """ think on the opponent's time until stop() is called, only used if pondering is set """
+        return None
+
+    def value_function(self, state: chess.Board) -> float:
+        """ value function that assigns a weight based on the current board state """
+        return material(state, self.color)
 
 
 class HumanPlayer(BasePlayer):
@@ -47,11 +53,28 @@ class HumanPlayer(BasePlayer):
 
 
 class TheFish(BasePlayer):
-    def __init__(self, seed: int | None = 1337, color: bool = False) -> None:
+    def __init__(self, seed: int | None = 1337, color: bool = False, *, engine_path: str | None = None,
+                 pool_size: int = 1, max_time: float = 5.) -> None:
+        """ Initialiser of the Stockfish player, the engine processes are shared with every other 
+        TheFish of the process and only started on the first move
+        Takes:
+            - seed: (optional int) the seed of the random number generator
+            - color: (bool) the color the player plays with
+            - engine_path: (optional str) the uci engine binary, defaults to const.STOCKFISH which can
+                           be set through the SCHMITTIE_STOCKFISH environment variable
+            - pool_size: (int) the number of engine processes searching at the same time
+            - max_time: (float) the most seconds spent on a move
+        """
         super().__init__(seed, color)
-        self.fish: engine.SimpleEngine = engine.SimpleEngine.popen_uci(r'C:\Stockfish\stockfish\stockfish-windows-x86-64-avx2.exe')
+        self.fish: EnginePool = get_pool(engine_path, pool_size)
+        self.max_time: float = max_time
 
-    def choose_move(self, state: chess.Board, time_left: int, *, move_fraction: float = 0.2) -> chess.Move | None:
-        result = self.fish.play(state, engine.Limit(min(time_left * move_fraction / 1000, 5)))
+    def choose_move(self, state: chess.Board, time_left: int, *, move_fraction: float = 0.2, 
+                    increment: int = 0) -> chess.Move | None:
+        limit = engine.Limit(time=min(time_left * move_fraction / 1000, self.max_time))
+        result = self.fish.play(state, limit)
         return result.move
-    
\ No newline at end of file
+
+    def close(self) -> None:
+        """ the engines stay in the shared pool for the next game, shutdown_pools() quits them """
+        return None
@@ -1,41 +1,365 @@
-from ..config import const
 from .player import BasePlayer
-from argparse import Namespace
+from .transposition import TranspositionTable, zobrist_key, decode_move, EXACT, LOWER, UPPER
+from .timing import TimeManager, SearchTimeout
+from .evaluation import Evaluator, material
+from .ordering import MoveOrderer
+from .stats import SearchStats, IterationStats
+from .book import OpeningBook
+from .tablebase import Tablebase
+from .position import SearchPosition
+from concurrent.futures import ProcessPoolExecutor, Future
+from contextlib import contextmanager
+from typing import Callable, Iterator
+import multiprocessing as mp
+import threading
 import numpy as np
 import chess
 import logging
 
 
-def _mirror_move(move: chess.Move | None) -> chess.Move | None:
-    if move is None:
-        return None
-    move_str: str = str(move)
-    new_move: str = (move_str[0] + const.ROW_INV[move_str[1]] 
-                    + move_str[2] + const.ROW_INV[move_str[3]])
-    new_move += move_str[4:]
-    return chess.Move.from_uci(new_move)
+# - null moves are searched this many plies less deep, one more at depths above 6. They are only
+#   tried from a depth that leaves a full ply after passing, so that threats of mate in one are seen
+_NULL_REDUCTION: int = 2
+_NULL_MIN_DEPTH: int = 4
+# - the width of the windows that only ask whether a score is above a bound, far below any score difference
+_NULL_WINDOW: float = 1e-4
+# - late move reductions start with the move after this many moves searched at this depth
+_LMR_MIN_MOVES: int = 3
+_LMR_MIN_DEPTH: int = 3
+
+
+@contextmanager
+def _trimmed_stack(state: chess.Board, keep: int | None) -> Iterator[chess.Board]:
+    """ temporarily drop all but the last `keep` plies of the move stack of a board 
+    without copying it, the dropped history is put back on exit. """
+    if keep is None or len(state.move_stack) <= keep:
+        yield state
+        return
+    cut: int = len(state.move_stack) - keep
+    moves: list[chess.Move] = state.move_stack[:cut]
+    states: list = state._stack[:cut]
+    del state.move_stack[:cut]
+    del state._stack[:cut]
+    try:
+        yield state
+    finally:
+        state.move_stack[:0] = moves
+        state._stack[:0] = states
 
 
 class PlayerMiniMax(BasePlayer):
-    def __init__(self, seed: int | None = 1337, color: bool = False) -> None:
+    def __init__(self, seed: int | None = 1337, color: bool = False, *, 
+                 tt_size_mb: float = 16., keep_tt: bool = True, max_depth: int = 32,
+                 timer: TimeManager | None = None, keep_stack: int | None = None,
+                 evaluator: Evaluator | None = None, quiescence: bool = True, qsearch_checks: bool = False,
+                 qsearch_max_ply: int = 8, delta_margin: float = 2., n_workers: int = 1,
+                 ponder: bool = False, ponder_hit_fraction: float = 0.5, stats: bool = False,
+                 on_iteration: Callable[[SearchStats], None] | None = None, book: str | None = None,
+                 book_max_ply: int | None = None, tablebase: str | None = None, 
+                 tb_cache_size: int = 2 ** 16, pvs: bool = True, null_move: bool = True, lmr: bool = True,
+                 aspiration: bool = True, aspiration_window: float = 0.5) -> None:
+        """ Initialiser of the MiniMax player
+        Takes:
+            - seed: (optional int) the seed of the random number generator
+            - color: (bool) the color the player plays with
+            - tt_size_mb: (float) memory cap of the transposition table in MiB
+            - keep_tt: (bool) keep the transposition table between moves instead of clearing it
+            - max_depth: (int) the deepest iteration of the iterative deepening
+            - timer: (optional TimeManager) derives the thinking time per move from the clock
+            - keep_stack: (optional int) only keep this many plies of the game history on the 
+                          move stack while searching, None keeps all of it
+            - evaluator: (optional Evaluator) the incremental leaf evaluation, material only by default
+            - quiescence: (bool) resolve captures at the leaves before evaluating them
+            - qsearch_checks: (bool) also search checking moves in the first ply of the quiescence search
+            - qsearch_max_ply: (int) the deepest the quiescence search goes beyond the leaves
+            - delta_margin: (float) captures that can not lift the score within this margin of alpha are pruned
+            - n_workers: (int) the number of processes searching in parallel, Lazy SMP style. Helpers 
+                         share the transposition table through shared memory and are kept alive 
+                         between moves, call close() to shut them down. One worker searches in 
+                         this process only and is deterministic for a fixed depth.
+            - ponder: (bool) search the expected reply while the opponent is thinking
+            - ponder_hit_fraction: (float) fraction of the usual budget spent when the opponent 
+                                   played the move that was pondered on
+            - stats: (bool) collect search statistics, the ones of the last search are kept in last_stats
+            - on_iteration: (optional callable) called with the statistics after every completed 
+                            iteration, enables stats
+            - book: (optional str) polyglot opening book, moves in the book are played without searching
+            - book_max_ply: (optional int) the book is not consulted after this many half moves
+            - tablebase: (optional str) directory of syzygy tables, positions with few enough pieces
+                         are looked up instead of searched
+            - tb_cache_size: (int) the number of tablebase results kept in memory
+            - pvs: (bool) search all but the first move of a node with a null window first
+            - null_move: (bool) prune nodes where passing still fails high, not in pawn endgames
+            - lmr: (bool) search late quiet moves less deep unless they beat alpha
+            - aspiration: (bool) search each iteration in a window around the score of the previous one
+            - aspiration_window: (float) the half width of the first aspiration window in pawns
+        """
         super().__init__(seed, color)
         self.logger = logging.getLogger('BaseMiniMaxPlayer')
         self.n_iter = 0
-        self.hash_map: dict[str, Namespace] = {} 
-        self.move_map: dict = {}
-
-    def choose_move(self, state: chess.Board, time_left: int, depth: int = 4, *, move_fraction: float = 0.2) -> chess.Move | None:
-        if not self.color:
-            state = state.mirror()
-            self.logger.warning('Player is black, mirroring board')
-        eval, move = self.minimax(state, True, depth,)
-        self.logger.info(f'Finished evaluating position up to depth: {depth}')
+        self.n_workers: int = max(1, n_workers)
+        self.tt: TranspositionTable = TranspositionTable(tt_size_mb, shared=self.n_workers > 1)
+        self.keep_tt: bool = keep_tt
+        self.max_depth: int = max_depth
+        self.timer: TimeManager = TimeManager() if timer is None else timer
+        self.keep_stack: int | None = keep_stack
+        self.evaluator: Evaluator = Evaluator() if evaluator is None else evaluator
+        self.orderer: MoveOrderer = MoveOrderer()
+        self.quiescence: bool = quiescence
+        self.qsearch_checks: bool = qsearch_checks
+        self.qsearch_max_ply: int = qsearch_max_ply
+        self.delta_margin: float = delta_margin
+        self._root_ply: int = 0
+        self._stop = threading.Event()
+        # - whether _stop was made by prepare_search for the next search, which uses it up
+        self._prepared: bool = False
+        # - the stop event of the running search, taken over from _stop when it starts
+        self._search_stop = self._stop
+        self._pool: ProcessPoolExecutor | None = None
+        self._helper_stop = None
+        self.pondering = ponder
+        self.ponder_hit_fraction: float = ponder_hit_fraction
+        self._ponder_key: int | None = None
+        self._ponder_result: tuple[float, chess.Move | None, int] = (0., None, 0)
+        self.stats: bool = stats or on_iteration is not None
+        self.on_iteration: Callable[[SearchStats], None] | None = on_iteration
+        self.last_stats: SearchStats | None = None
+        # - counters of the running search, None when statistics are disabled
+        self._stats: SearchStats | None = None
+        self.book: OpeningBook | None = None if book is None else OpeningBook(book, book_max_ply)
+        self.tablebase: Tablebase | None = None if tablebase is None else Tablebase(tablebase, tb_cache_size)
+        self.pvs: bool = pvs
+        self.null_move: bool = null_move
+        self.lmr: bool = lmr
+        self.aspiration: bool = aspiration
+        self.aspiration_window: float = aspiration_window
+        if self.n_workers > 1:
+            self._start_pool()
+
+    def choose_move(self, state: chess.Board, time_left: int, depth: int | None = None, *, 
+                    move_fraction: float = 0.2, increment: int = 0) -> chess.Move | None:
+        """ iterative deepening search within the time budget of this move. 
+        The search runs on a SearchPosition made from the board, the board itself is left as it is.
+        Takes:
+            - state: (chess.Board) the position to find a move in
+            - time_left: (int) the time left on the clock of the player in milliseconds
+            - depth: (optional int) the deepest iteration, defaults to max_depth
+            - move_fraction: (float) the largest fraction of time_left to spend on the move
+            - increment: (int) the increment per move in milliseconds
+        """
+        self._claim_stop()
+        if self.book is not None:
+            book_move: chess.Move | None = self.book.choose(state, self.rng)
+            if book_move is not None:
+                self._ponder_key = None
+                self.logger.info(f'Book move: {book_move}')
+                return book_move
+        if self.tablebase is not None:
+            tb_move: chess.Move | None = self.tablebase.root_move(state)
+            if tb_move is not None:
+                self._ponder_key = None
+                self.logger.info(f'Tablebase move: {tb_move}')
+                return tb_move
+        budget: int = self.timer.start(time_left, increment, state.fullmove_number, move_fraction)
+        # - ponder hit, the position was already searched on the opponent's time
+        ponder_hit: bool = self._ponder_key is not None and self._ponder_key == zobrist_key(state)
+        self._ponder_key = None
+        if ponder_hit:
+            self.timer.scale(self.ponder_hit_fraction)
+            self.logger.info(f'Ponder hit, reusing search up to depth {self._ponder_result[2]}')
+        elif self.keep_tt:
+            self.tt.new_search()
+        else:
+            self.tt.clear()
+        self.orderer.new_search()
+        max_depth: int = self.max_depth if depth is None else depth
+
+        helpers: list[Future] = self._start_helpers(state, max_depth)
+        eval, move, completed = self._iterate(state, max_depth)
+        if ponder_hit and self._ponder_result[2] > completed and self._ponder_result[1] is not None:
+            eval, move, completed = self._ponder_result
+        for helper_depth, helper_eval, helper_move, helper_nodes in self._stop_helpers(helpers):
+            if self.last_stats is not None:
+                self.last_stats.helper_nodes += helper_nodes
+            # - a helper that got deeper than this process has the better move
+            if helper_depth > completed and helper_move is not None:
+                eval, move, completed = helper_eval, helper_move, helper_depth
+
+        if move is None:
+            # - every move loses or not even one ply was finished, still have to play something
+            move = next(iter(state.legal_moves), None)
+        self.logger.info(f'Finished evaluating position up to depth: {completed} '
+                         f'in {self.timer.elapsed():.2f}s of {budget / 1000:.2f}s')
         self.logger.info(f'Best move found: {move} with evaluation: {eval:.2f}')
-        if not self.color:
-            move = _mirror_move(move)
-            self.logger.warning(f'Player is black, mirrored move to: {move}')
+        if self.last_stats is not None:
+            self.logger.info(f'Search statistics: {self.last_stats.summary()}')
         return move
     
+    def _iterate(self, state: chess.Board, max_depth: int, 
+                 min_depth: int = 1) -> tuple[float, chess.Move | None, int]:
+        """ deepen one ply at a time until max_depth or the deadline of the timer, every 
+        iteration finds the best move of the previous one in the transposition table and 
+        searches it first. Returns the score, move and depth of the last completed iteration. 
+        With statistics enabled the counters of the search are kept in last_stats. """
+        self.n_iter = 0
+        self._search_stop = self._stop
+        # - the search runs on its own position, only the history kept on the stack is replayed into it
+        with _trimmed_stack(state, self.keep_stack):
+            position: SearchPosition = SearchPosition.from_board(state)
+        self.evaluator.reset(position)
+        self._root_ply = position.ply()
+        if self.tablebase is not None:
+            self.tablebase.open()
+        stats: SearchStats | None = SearchStats() if self.stats else None
+        self._stats = self.last_stats = stats
+        eval, move = 0., None
+        completed: int = 0
+        for target in range(min_depth, max_depth + 1):
+            started: float = self.timer.elapsed()
+            nodes, qnodes = (0, 0) if stats is None else (stats.nodes, stats.qnodes)
+            try:
+                score, best_move = self._aspirate(position, target, eval if completed else None)
+            except SearchTimeout:
+                break
+            eval, completed = score, target
+            move = decode_move(best_move) or move
+            self.logger.debug(f'Depth {target} done after {self.timer.elapsed():.2f}s: {move} ({eval:.2f})')
+            if stats is not None:
+                stats.iterations.append(IterationStats(target, eval, move, stats.nodes - nodes, stats.qnodes - qnodes,
+                                                       self.timer.elapsed() - started, self.timer.elapsed()))
+                if self.on_iteration is not None:
+                    self.on_iteration(stats)
+            if abs(eval) == np.inf or not self.timer.can_start_iteration():
+                break
+        if stats is not None:
+            stats.seconds = self.timer.elapsed()
+        self._stats = None
+        return eval, move, completed
+
+    def _aspirate(self, position: SearchPosition, depth: int, previous: float | None) -> tuple[float, int]:
+        """ one iteration of the iterative deepening. With aspiration windows it is first searched in a
+        narrow window around the score of the previous iteration, a score outside of it is only a bound 
+        and the side it fell out of is widened until the score lands inside. """
+        if not self.aspiration or previous is None or np.isinf(previous):
+            return self.negamax(position, depth)
+        width: float = self.aspiration_window
+        alpha, beta = previous - width, previous + width
+        while True:
+            score, move = self.negamax(position, depth, alpha, beta)
+            if alpha < score < beta or (score <= alpha and np.isinf(alpha)) or (score >= beta and np.isinf(beta)):
+                return score, move
+            if self._stats is not None:
+                self._stats.aspiration_fails += 1
+            width *= 4
+            # - past a few queens the window is opened all the way, mates are scored infinitely
+            if score <= alpha:
+                alpha = -np.inf if width > 20 else previous - width
+            else:
+                beta = np.inf if width > 20 else previous + width
+
+    def ponder(self, state: chess.Board) -> None:
+        """ search on the opponent's time until stop() is called. The reply expected from the 
+        last search is made and the resulting position is searched, if there is no expected 
+        reply the current position is searched to fill the transposition table instead. 
+        Takes:
+            - state: (chess.Board) the current position with the opponent to move
+        """
+        self._claim_stop()
+        self._ponder_key = None
+        frame: chess.Board = state.copy()
+        entry = self.tt.probe(zobrist_key(frame))
+        predicted: chess.Move | None = None if entry is None else decode_move(entry.move)
+        if predicted is not None and frame.is_legal(predicted):
+            frame.push(predicted)
+        else:
+            predicted = None
+        if self.keep_tt:
+            self.tt.new_search()
+        self.orderer.new_search()
+        self.timer.start_infinite()
+        result: tuple[float, chess.Move | None, int] = self._iterate(frame, self.max_depth)
+        if predicted is not None:
+            self._ponder_key, self._ponder_result = zobrist_key(frame), result
+        self.logger.info(f'Pondered on {predicted} up to depth {result[2]} for {self.timer.elapsed():.2f}s')
+        return None
+
+    def stop(self) -> None:
+        """ ask a running search to return its best move as soon as possible, a search scheduled 
+        with prepare_search that did not start yet returns right away once it does. Sent while 
+        neither is the case it does not affect later searches """
+        self._stop.set()
+        return None
+
+    def prepare_search(self) -> None:
+        """ give the next search a stop event of its own. The event is never cleared by the search itself, 
+        so a stop() between scheduling and starting the search is not lost, and a search that is still 
+        winding down from an earlier stop() is not revived by the next one """
+        self._stop = threading.Event()
+        self._prepared = True
+        return None
+
+    def _claim_stop(self) -> None:
+        """ take the stop event for the search that starts now. The one of prepare_search is used by
+        this search only, without it a fresh event is made, so that a stop() sent while no search
+        was running does not cut short every search that follows """
+        if not self._prepared:
+            self._stop = threading.Event()
+        self._prepared = False
+        return None
+
+    def close(self) -> None:
+        """ shut down the helper processes and release the shared transposition table """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self.book is not None:
+            self.book.close()
+        if self.tablebase is not None:
+            self.tablebase.close()
+        self.tt.close()
+        return None
+
+    def _helper_settings(self) -> dict:
+        """ arguments to build the search of a helper process with """
+        return {'max_depth': self.max_depth, 'keep_stack': self.keep_stack, 'evaluator': self.evaluator,
+                'quiescence': self.quiescence, 'qsearch_checks': self.qsearch_checks,
+                'qsearch_max_ply': self.qsearch_max_ply, 'delta_margin': self.delta_margin,
+                'tablebase': None if self.tablebase is None else self.tablebase.path,
+                'tb_cache_size': 2 ** 16 if self.tablebase is None else self.tablebase.cache_size,
+                'pvs': self.pvs, 'null_move': self.null_move, 'lmr': self.lmr, 'aspiration': self.aspiration,
+                'aspiration_window': self.aspiration_window}
+
+    def _start_pool(self) -> None:
+        """ start the helper processes, they stay alive until close() """
+        if self._pool is not None:
+            return None
+        # - spawned rather than forked, the game may be running other threads
+        context = mp.get_context('spawn')
+        self._helper_stop = context.Event()
+        self._pool = ProcessPoolExecutor(self.n_workers - 1, mp_context=context, initializer=_init_helper,
+                                         initargs=(self._helper_settings(), self.tt.name, self.tt.size_mb,
+                                                   self._helper_stop))
+        # - submitting anything starts the processes, so that the first move does not pay for it
+        self._pool.submit(_helper_ready)
+        return None
+
+    def _start_helpers(self, state: chess.Board, max_depth: int) -> list[Future]:
+        """ start the helper searches on the position, they fill the shared transposition table """
+        if self.n_workers < 2:
+            return []
+        self._start_pool()
+        self._helper_stop.clear()
+        return [self._pool.submit(_helper_search, state, self.timer.remaining(), max_depth, self.tt.age, worker)
+                for worker in range(1, self.n_workers)]
+
+    def _stop_helpers(self, helpers: list[Future]) -> list[tuple[int, float, chess.Move | None, int]]:
+        """ stop the helper searches and collect their deepest completed iterations and node counts """
+        if not helpers:
+            return []
+        self._helper_stop.set()
+        # - helpers that did not even start yet are dropped instead of waited for
+        return [helper.result() for helper in helpers if not helper.cancel()]
+    
     def value_function(self, state: chess.Board) -> float:
         return super().value_function(state)
     
@@ -43,16 +367,18 @@ class PlayerMiniMax(BasePlayer):
         """ minimax without pruning, brute forcing the way through the result tree 
         roughly a factor 100 slower than the minimax with pruning. """
         if not depth or state.is_game_over():
-            return _eval(state, player), move
+            return _eval(state, True), move
         
         moves: list[chess.Move] = generate_legal_moves(state)
         if player:
             max_score: float = -np.inf
             best_move: None | chess.Move = None
             for move in moves:
-                child_board = state.copy()
-                child_board.push(move)
-                score = self.minimax_slow(child_board, False, depth - 1, best_move)[0]
+                state.push(move)
+                try:
+                    score = self.minimax_slow(state, False, depth - 1, best_move)[0]
+                finally:
+                    state.pop()
                 max_score = max(score, max_score)
                 best_move = move if score == max_score else best_move
             return max_score, best_move
@@ -60,55 +386,245 @@ class PlayerMiniMax(BasePlayer):
             min_score: float = np.inf
             best_move: None | chess.Move = None
             for move in moves:
-                child_board = state.copy()
-                child_board.push(move)
-                score = self.minimax_slow(child_board, True, depth - 1, best_move)[0]
+                state.push(move)
+                try:
+                    score = self.minimax_slow(state, True, depth - 1, best_move)[0]
+                finally:
+                    state.pop()
                 min_score = min(score, min_score)
                 best_move = move if score == min_score else best_move
             return min_score, best_move
     
-    def minimax(self, state: chess.Board, player: bool, depth: int, alpha: float = -np.inf, 
-                beta: float = np.inf, move: chess.Move | None = None) -> tuple[float, chess.Move | None]:
-        """ minimax with alpha beta pruning 
+    def negamax(self, position: SearchPosition, depth: int, alpha: float = -np.inf, beta: float = np.inf,
+                null_allowed: bool = True) -> tuple[float, int]:
+        """ alpha beta search in negamax form, scores are always seen from the side to move
         recursively explore the children up to a given maximum depth, pruning the tree based on 
-        whether or not the other possible paths already give results that are better / worse
-        depending on the player that is maximising their outcome. 
+        whether or not the other moves already give a result the side to move can not improve on.
+        Results are stored in the transposition table and reused whenever the same position is 
+        reached again. Depending on the switches of the player the first move is searched with the
+        full window and the others with a null window (principal variation search), nodes where
+        passing still fails high are cut (null move pruning) and late quiet moves are searched 
+        less deep (late move reductions), every scout that beats alpha is searched again. 
         Takes:
-            - state: (chess.Board) the board from which to start
-            - player: (bool) the player which is optimising their turn
+            - position: (SearchPosition) the position from which to start
             - depth: (int) the current depth target
-            - alpha: (float) the running alpha pruning parameter, used for player TRUE
-            - beta: (float) the running beta pruning parameter, used for player FALSE
-            - move: (chess.Move) the best move propagated through the chain. 
+            - alpha: (float) the score the side to move is already guaranteed
+            - beta: (float) the score the opponent is already guaranteed, seen from the side to move
+            - null_allowed: (bool) whether a null move may be tried, not twice in a row
+        Returns the score and the code of the best move, 0 if there is none.
+        The evaluator has to be reset to position before the search is started. 
+        Raises SearchTimeout once the deadline of the timer has passed. 
         """
-        if not depth or state.is_game_over():
-            return _eval(state, player), move
+        self.n_iter += 1
+        if not self.n_iter & 63 and self._should_stop():
+            raise SearchTimeout
+        stats: SearchStats | None = self._stats
+        if stats is not None:
+            stats.nodes += 1
+        # - generated once, the outcome, the quiescence search and the ordering all use them
+        legal_moves: list[int] = position.legal_moves()
+        outcome: chess.Outcome | None = position.outcome(legal_moves)
+        if outcome is not None:
+            return _outcome_score(outcome, position.turn), 0
+        ply: int = position.ply() - self._root_ply
+        tablebase: Tablebase | None = self.tablebase
+        if tablebase is not None and ply and position.occupied.bit_count() <= tablebase.max_pieces:
+            # - endgames in the tables are looked up instead of searched, the root is left to root_move
+            tb_score: float | None = tablebase.score(position)
+            if tb_score is not None:
+                if stats is not None:
+                    stats.tb_hits += 1
+                return tb_score, 0
+        if not depth:
+            if not self.quiescence:
+                return self.evaluator.evaluate(position.turn), 0
+            return self.qsearch(position, alpha, beta, moves=legal_moves), 0
         
-        moves: list[chess.Move] = generate_legal_moves(state)
-        if player:
-            best_move: None | chess.Move = None
-            for move in moves:
-                child_board = state.copy()
-                child_board.push(move)
-                score = self.minimax(child_board, False, depth - 1, alpha, beta, best_move)[0]
-                if score > alpha:
-                    alpha = score
-                    best_move = move
-                if score >= beta:
-                    break
-            return alpha, best_move
+        key: int = position.key
+        entry = self.tt.probe(key)
+        hash_move: int = 0
+        if stats is not None:
+            stats.tt_probes += 1
+            stats.tt_hits += entry is not None
+        if entry is not None:
+            hash_move = entry.move
+            # - the move of a cutoff at the root is the one that is played, it has to be legal
+            if entry.depth >= depth and (ply or hash_move in legal_moves) and (
+                    entry.flag == EXACT or (entry.flag == LOWER and entry.score >= beta)
+                    or (entry.flag == UPPER and entry.score <= alpha)):
+                if stats is not None:
+                    stats.tt_cutoffs += 1
+                return entry.score, hash_move
+
+        in_check: bool = position.is_check()
+        pieces: list[int] = position.pieces
+        if (self.null_move and null_allowed and ply and depth >= _NULL_MIN_DEPTH and not in_check 
+                and beta < np.inf and position.occupied_co[position.turn] & ~(pieces[chess.PAWN] | pieces[chess.KING])
+                and self.evaluator.evaluate(position.turn) >= beta):
+            # - even passing keeps the score above beta, a real move will too. Positions with only 
+            #   king and pawns are left out, there passing is often the best move (zugzwang)
+            reduction: int = _NULL_REDUCTION + (depth > 6)
+            self.evaluator.push(position, 0)
+            try:
+                score: float = -self.negamax(position, max(depth - 1 - reduction, 0), -beta, -beta + _NULL_WINDOW, 
+                                             null_allowed=False)[0]
+            finally:
+                self.evaluator.pop(position)
+            if stats is not None:
+                stats.null_tries += 1
+                stats.null_cutoffs += score >= beta
+            if score >= beta:
+                # - a mate found after passing is not proven, only the bound is returned
+                return beta, 0
+
+        # - staged ordering, the best move of an earlier search goes first
+        moves: Iterator[int] = self.orderer.moves(position, legal_moves, hash_move, ply)
+
+        alpha_init: float = alpha
+        searched: int = 0
+        best_move: int = 0
+        for move in moves:
+            quiet: bool = not move >> 12 and not position.is_capture(move)
+            self.evaluator.push(position, move)
+            try:
+                if not searched or np.isinf(alpha) or not (self.pvs or self.lmr):
+                    score = -self.negamax(position, depth - 1, -beta, -alpha)[0]
+                else:
+                    reduction = 0
+                    if (self.lmr and quiet and depth >= _LMR_MIN_DEPTH and searched >= _LMR_MIN_MOVES 
+                            and not in_check and not position.is_check()):
+                        reduction = 1 + (searched >= 3 * _LMR_MIN_MOVES and depth >= 6)
+                        if stats is not None:
+                            stats.reductions += 1
+                    scout: float = alpha + _NULL_WINDOW if self.pvs else beta
+                    score = -self.negamax(position, depth - 1 - reduction, -scout, -alpha)[0]
+                    if score > alpha and reduction:
+                        # - a reduced move that beats alpha is looked at again with the full depth
+                        score = -self.negamax(position, depth - 1, -scout, -alpha)[0]
+                        if stats is not None:
+                            stats.researches += 1
+                    if self.pvs and alpha < score < beta:
+                        # - the scout only proved the move beats alpha, its score needs the full window
+                        score = -self.negamax(position, depth - 1, -beta, -alpha)[0]
+                        if stats is not None:
+                            stats.researches += 1
+            finally:
+                self.evaluator.pop(position)
+            searched += 1
+            if score > alpha:
+                alpha = score
+                best_move = move
+            if score >= beta:
+                self.orderer.store_cutoff(position, move, depth, ply)
+                break
+        flag: int = UPPER if alpha <= alpha_init else LOWER if alpha >= beta else EXACT
+        if stats is not None:
+            _count_node(stats, searched, alpha >= beta)
+        self.tt.store(key, depth, alpha, flag, best_move)
+        return alpha, best_move
+
+    def _should_stop(self) -> bool:
+        return self.timer.expired() or self._search_stop.is_set()
+
+    def qsearch(self, position: SearchPosition, alpha: float, beta: float, qply: int = 0, 
+                moves: list[int] | None = None) -> float:
+        """ quiescence search at the leaves of minimax 
+        only captures are searched (and checks in the first ply if enabled) until the position 
+        is quiet, so that the evaluation is not taken in the middle of an exchange. The side to 
+        move may always stand pat on the static evaluation unless it is in check. 
+        Takes:
+            - position: (SearchPosition) the position to resolve
+            - alpha: (float) the lower bound of the window, seen from the side to move
+            - beta: (float) the upper bound of the window, seen from the side to move
+            - qply: (int) the number of plies beyond the leaf of the main search
+            - moves: (optional list[int]) the legal moves of position if they are known already
+        Returns the score from the point of view of the side to move. 
+        """
+        self.n_iter += 1
+        if not self.n_iter & 63 and self._should_stop():
+            raise SearchTimeout
+        if self._stats is not None:
+            self._stats.qnodes += 1
+        in_check: bool = position.is_check()
+        stand_pat: float = self.evaluator.evaluate(position.turn)
+        if qply >= self.qsearch_max_ply:
+            return stand_pat
+
+        if in_check:
+            # - no standing pat in check, every evasion has to be looked at
+            moves = list(self.orderer.moves(position, moves))
+            if not moves:
+                return -np.inf
         else:
-            best_move: None | chess.Move = None
-            for move in moves:
-                child_board = state.copy()
-                child_board.push(move)
-                score = self.minimax(child_board, True, depth - 1, alpha, beta, best_move)[0]
-                if score < beta:
-                    beta = score
-                    best_move = move
-                if score <= alpha:
-                    break
-            return beta, best_move
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            if self.qsearch_checks and not qply:
+                legal_moves: list[int] = position.legal_moves() if moves is None else moves
+                moves = self.orderer.captures(position, legal_moves)
+                moves += [move for move in legal_moves if not position.is_capture(move) and position.gives_check(move)]
+            else:
+                moves = self.orderer.captures(position, moves)
+
+        squares: list[int] = position.squares
+        for move in moves:
+            if not in_check and not move >> 12 and position.is_capture(move):
+                # - delta pruning, even winning the captured piece for free would not reach alpha
+                victim: int = squares[move >> 6 & 63] or chess.PAWN
+                if stand_pat + self.evaluator.values[victim] + self.delta_margin < alpha:
+                    continue
+            self.evaluator.push(position, move)
+            try:
+                score: float = -self.qsearch(position, -beta, -alpha, qply + 1)
+            finally:
+                self.evaluator.pop(position)
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+
+# - search of the helper processes of the parallel search
+_HELPER: PlayerMiniMax | None = None
+
+
+def _init_helper(settings: dict, tt_name: str, tt_size_mb: float, stop) -> None:
+    global _HELPER
+    # - tiny private table that is swapped for the shared one right away
+    _HELPER = PlayerMiniMax(tt_size_mb=0, **settings)
+    _HELPER.tt = TranspositionTable(tt_size_mb, name=tt_name)
+    _HELPER._stop = stop
+    return None
+
+
+def _helper_ready() -> bool:
+    return _HELPER is not None
+
+
+def _helper_search(state: chess.Board, budget: int, max_depth: int, 
+                   age: int, worker: int) -> tuple[int, float, chess.Move | None, int]:
+    """ Lazy SMP helper, searches the same position as the main process until stopped.
+    Odd helpers skip the first iteration and the history of every helper gets a little
+    noise, so that the helpers spread out over the tree instead of repeating each other. """
+    player: PlayerMiniMax = _HELPER  # type: ignore[assignment]
+    player.tt.age = age
+    player.orderer.new_search()
+    rng = np.random.default_rng(worker)
+    player.orderer.history = [value + int(noise) for value, noise in 
+                              zip(player.orderer.history, rng.integers(0, 4, len(player.orderer.history)))]
+    player.timer.start_fixed(budget)
+    eval, move, completed = player._iterate(state, max_depth, min_depth=1 + worker % 2)
+    return completed, eval, move, player.n_iter
+
+
+def _count_node(stats: SearchStats, searched: int, cutoff: bool) -> None:
+    """ count an expanded node of the search, with how many moves it took to fail high if it did """
+    stats.expanded += 1
+    stats.children += searched
+    if cutoff:
+        stats.cutoffs += 1
+        stats.first_move_cutoffs += searched == 1
+    return None
 
 
 def generate_legal_moves(state: chess.Board) -> list[chess.Move]:
@@ -119,18 +635,14 @@ def generate_legal_moves(state: chess.Board) -> list[chess.Move]:
     return list(legal_moves_ordered)
 
 
+def _outcome_score(outcome: chess.Outcome, color: bool) -> float:
+    if outcome.winner is None:
+        return 0
+    return np.inf if outcome.winner == color else -np.inf
+
+
 def _eval(state: chess.Board, color: bool) -> float:
-        if state.is_game_over():
-            if state.outcome():
-                return np.inf
-            return 0
-        value: float = 0.
-
-        for i in range(const.COLS * const.ROWS):
-            piece: chess.Piece | None = state.piece_at(i)
-            if piece is None:
-                continue
-            val = const.VALUE_HASH[piece.piece_type] 
-            value = value + val if piece.color == color else value - val
-
-        return value # if color else -1 * value
\ No newline at end of file
+    outcome: chess.Outcome | None = state.outcome()
+    if outcome is not None:
+        return _outcome_score(outcome, color)
+    return material(state, color)
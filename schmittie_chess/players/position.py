@@ -0,0 +1,579 @@
+from .transposition import encode_move, decode_move
+from typing import Iterator, Self
+import chess
+import chess.polyglot
+
+
+BB_ALL: int = (1 << 64) - 1
+_BB: list[int] = [1 << square for square in range(64)]
+_FILE_A: int = 0x0101010101010101
+_FILE_H: int = _FILE_A << 7
+_RANK_1: int = 0xFF
+_RANK_3: int = _RANK_1 << 16
+_RANK_6: int = _RANK_1 << 40
+_RANK_8: int = _RANK_1 << 56
+_DARK: int = 0xAA55AA55AA55AA55
+_PROMOTIONS: tuple[int, ...] = (chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT)
+# - standard castling is encoded as a two square king move, the rook jumps over the king. 
+#   The squares the rook moves from and to by the square the king lands on
+CASTLING_ROOK_SQUARES: dict[int, tuple[int, int]] = {chess.G1: (chess.H1, chess.F1), chess.C1: (chess.A1, chess.D1),
+                                                     chess.G8: (chess.H8, chess.F8), chess.C8: (chess.A8, chess.D8)}
+# - a piece on the board: its color, piece type and square
+Placement = tuple[bool, int, int]
+
+
+def _ray(square: int, step: tuple[int, int], occupied: int = 0) -> int:
+    """ squares reached from square in the direction of step, up to and including the first blocker """
+    attacks: int = 0
+    file, rank = square % 8 + step[0], square // 8 + step[1]
+    while 0 <= file < 8 and 0 <= rank < 8:
+        attacks |= _BB[rank * 8 + file]
+        if occupied & _BB[rank * 8 + file]:
+            break
+        file, rank = file + step[0], rank + step[1]
+    return attacks
+
+
+def _leaper(square: int, steps: tuple[tuple[int, int], ...]) -> int:
+    file, rank = square % 8, square // 8
+    return sum(_BB[(rank + dr) * 8 + file + df] for df, dr in steps if 0 <= file + df < 8 and 0 <= rank + dr < 8)
+
+
+def _inner(square: int, step: tuple[int, int]) -> int:
+    """ the ray from square in the direction of step without its last square, the edge of the board """
+    inner: int = 0
+    file, rank = square % 8 + step[0], square // 8 + step[1]
+    while 0 <= file + step[0] < 8 and 0 <= rank + step[1] < 8:
+        inner |= _BB[rank * 8 + file]
+        file, rank = file + step[0], rank + step[1]
+    return inner
+
+
+def _line_table(line: tuple[tuple[int, int], tuple[int, int]]) -> tuple[list[int], list[dict[int, int]]]:
+    """ sliding attacks along one line through every square, looked up by the occupancy of the line.
+    The edges can not block anything behind them and are left out of the masks, so a line has at
+    most 6 relevant squares and 64 entries per square. Python ints hash to themselves, a dict keyed
+    by the masked occupancy is as fast as a magic multiplication and needs no magic numbers. """
+    masks: list[int] = []
+    tables: list[dict[int, int]] = []
+    for square in range(64):
+        mask: int = _inner(square, line[0]) | _inner(square, line[1])
+        table: dict[int, int] = {}
+        subset: int = 0
+        while True:
+            # - every subset of the mask, by the carry rippler
+            table[subset] = _ray(square, line[0], subset) | _ray(square, line[1], subset)
+            subset = (subset - mask) & mask
+            if not subset:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+
+_KNIGHT: list[int] = [_leaper(sq, ((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)))
+                      for sq in range(64)]
+_KING: list[int] = [_leaper(sq, ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)))
+                    for sq in range(64)]
+# - indexed [color][square], the squares a pawn of color on square attacks
+_PAWN: list[list[int]] = [[_leaper(sq, ((-1, -1), (1, -1))) for sq in range(64)],
+                          [_leaper(sq, ((-1, 1), (1, 1))) for sq in range(64)]]
+_FILE_MASK, _FILE_ATTACKS = _line_table(((0, 1), (0, -1)))
+_RANK_MASK, _RANK_ATTACKS = _line_table(((1, 0), (-1, 0)))
+_DIAG_MASK, _DIAG_ATTACKS = _line_table(((1, 1), (-1, -1)))
+_ANTI_MASK, _ANTI_ATTACKS = _line_table(((1, -1), (-1, 1)))
+# - attacks on an empty board, and the squares strictly between two squares on a line
+_ROOK_RAYS: list[int] = [_FILE_ATTACKS[sq][0] | _RANK_ATTACKS[sq][0] for sq in range(64)]
+_BISHOP_RAYS: list[int] = [_DIAG_ATTACKS[sq][0] | _ANTI_ATTACKS[sq][0] for sq in range(64)]
+_BETWEEN: list[list[int]] = [[0] * 64 for _ in range(64)]
+for _a in range(64):
+    for _step in ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)):
+        # - walked outwards from _a, every square gets the ones passed on the way
+        _path: int = 0
+        _file, _rank = _a % 8 + _step[0], _a // 8 + _step[1]
+        while 0 <= _file < 8 and 0 <= _rank < 8:
+            _BETWEEN[_a][_rank * 8 + _file] = _path
+            _path |= _BB[_rank * 8 + _file]
+            _file, _rank = _file + _step[0], _rank + _step[1]
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    return _FILE_ATTACKS[square][occupied & _FILE_MASK[square]] | _RANK_ATTACKS[square][occupied & _RANK_MASK[square]]
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    return _DIAG_ATTACKS[square][occupied & _DIAG_MASK[square]] | _ANTI_ATTACKS[square][occupied & _ANTI_MASK[square]]
+
+
+# - polyglot random numbers, so that keys are the ones of chess.polyglot.zobrist_hash and the
+#   transposition table and opening books can be shared with chess.Board positions
+_RANDOM: list[int] = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+_PIECE_KEYS: list[list[list[int]]] = [[[0] * 64] + [[_RANDOM[64 * (2 * (piece - 1) + color) + sq] for sq in range(64)]
+                                       for piece in range(1, 7)] for color in (chess.BLACK, chess.WHITE)]
+_CASTLING_ROOKS: tuple[tuple[int, int], ...] = ((chess.BB_H1, 768), (chess.BB_A1, 769), (chess.BB_H8, 770), (chess.BB_A8, 771))
+_CASTLING_KEYS: dict[int, int] = {}
+for _rights in range(16):
+    _mask: int = sum(bb for i, (bb, _) in enumerate(_CASTLING_ROOKS) if _rights >> i & 1)
+    _CASTLING_KEYS[_mask] = 0
+    for _bb, _index in _CASTLING_ROOKS:
+        _CASTLING_KEYS[_mask] ^= _RANDOM[_index] if _mask & _bb else 0
+_TURN_KEY: int = _RANDOM[780]
+
+
+def _scan(bb: int) -> Iterator[int]:
+    while bb:
+        square: int = bb.bit_length() - 1
+        yield square
+        bb ^= _BB[square]
+
+
+class SearchPosition:
+    """ a chess position specialised for the search. Pieces are kept in bitboards and a square table,
+    moves are the 16 bit codes of transposition.encode_move, attacks come from precomputed tables,
+    legality is only tested for the few moves that can expose the king (king moves, en passant,
+    pinned pieces and evasions) and the polyglot zobrist key is updated with every move.
+    The game is over exactly when legal_moves() comes back empty, so checkmate and stalemate
+    cost no extra move generation. Only standard chess, not chess960, is supported. """
+    __slots__ = ('pieces', 'occupied_co', 'occupied', 'squares', 'turn', 'castling_rights', 'ep_square',
+                 'halfmove_clock', 'fullmove_number', 'key', '_stack', '_keys')
+
+    def __init__(self) -> None:
+        """ Initialiser of an empty SearchPosition, use from_board or from_fen to set one up """
+        # - bitboards of both colors by piece type, index 0 is unused
+        self.pieces: list[int] = [0] * 7
+        self.occupied_co: list[int] = [0, 0]
+        self.occupied: int = 0
+        # - the piece type on every square, 0 for empty
+        self.squares: list[int] = [0] * 64
+        self.turn: bool = chess.WHITE
+        # - the squares of the rooks that may still castle, like chess.Board.castling_rights
+        self.castling_rights: int = 0
+        self.ep_square: int | None = None
+        self.halfmove_clock: int = 0
+        self.fullmove_number: int = 1
+        self.key: int = 0
+        self._stack: list[tuple] = []
+        # - keys of the positions before each move, for repetitions
+        self._keys: list[int] = []
+        return None
+
+    @classmethod
+    def from_fen(cls, fen: str = chess.STARTING_FEN) -> Self:
+        return cls.from_board(chess.Board(fen))
+
+    @classmethod
+    def from_board(cls, state: chess.Board) -> Self:
+        """ the position of a board, the moves on its stack are played from its root so that
+        repetitions of earlier positions are recognised """
+        if state.chess960:
+            raise ValueError('SearchPosition only supports standard chess')
+        root: chess.Board = state.root()
+        position = cls()
+        for piece_type in chess.PIECE_TYPES:
+            position.pieces[piece_type] = root.pieces_mask(piece_type, chess.WHITE) | root.pieces_mask(piece_type, chess.BLACK)
+        position.occupied_co = [root.occupied_co[chess.BLACK], root.occupied_co[chess.WHITE]]
+        position.occupied = root.occupied
+        position.squares = [root.piece_type_at(square) or 0 for square in chess.SQUARES]
+        position.turn = root.turn
+        position.castling_rights = root.clean_castling_rights()
+        position.ep_square = root.ep_square
+        position.halfmove_clock = root.halfmove_clock
+        position.fullmove_number = root.fullmove_number
+        position.key = position.zobrist()
+        for move in state.move_stack:
+            position.push(encode_move(move))
+        return position
+
+    def to_board(self) -> chess.Board:
+        """ the position as a chess.Board, without the moves that led to it """
+        state: chess.Board = chess.Board.empty()
+        for color in (chess.WHITE, chess.BLACK):
+            for square in _scan(self.occupied_co[color]):
+                state.set_piece_at(square, chess.Piece(self.squares[square], color))
+        state.turn = self.turn
+        state.castling_rights = self.castling_rights
+        state.ep_square = self.ep_square
+        state.halfmove_clock = self.halfmove_clock
+        state.fullmove_number = self.fullmove_number
+        return state
+
+    def fen(self) -> str:
+        return self.to_board().fen()
+
+    def zobrist(self) -> int:
+        """ the polyglot key computed from scratch, push and pop keep self.key equal to it """
+        key: int = 0
+        for color in (chess.WHITE, chess.BLACK):
+            for square in _scan(self.occupied_co[color]):
+                key ^= _PIECE_KEYS[color][self.squares[square]][square]
+        return key ^ _CASTLING_KEYS[self.castling_rights] ^ self._ep_key() ^ (_TURN_KEY if self.turn else 0)
+
+    def _ep_key(self) -> int:
+        """ the en passant file is only hashed if a pawn of the side to move could capture """
+        ep: int | None = self.ep_square
+        if ep is None or not _PAWN[not self.turn][ep] & self.pieces[chess.PAWN] & self.occupied_co[self.turn]:
+            return 0
+        return _RANDOM[772 + (ep & 7)]
+
+    def attackers(self, color: bool, square: int, occupied: int | None = None, mask: int | None = None) -> int:
+        """ the pieces of color attacking square
+        Takes:
+            - color: (bool) the side of the attackers
+            - square: (int) the attacked square
+            - occupied: (optional int) the occupancy the sliders see, defaults to the board
+            - mask: (optional int) the pieces that count as attackers, defaults to all pieces of color
+        """
+        occupied = self.occupied if occupied is None else occupied
+        own: int = self.occupied_co[color] if mask is None else mask
+        pieces: list[int] = self.pieces
+        queens: int = pieces[chess.QUEEN]
+        return own & ((_KNIGHT[square] & pieces[chess.KNIGHT]) | (_KING[square] & pieces[chess.KING])
+                      | (_PAWN[not color][square] & pieces[chess.PAWN])
+                      | (rook_attacks(square, occupied) & (pieces[chess.ROOK] | queens))
+                      | (bishop_attacks(square, occupied) & (pieces[chess.BISHOP] | queens)))
+
+    def pieces_mask(self, piece_type: int, color: bool) -> int:
+        return self.pieces[piece_type] & self.occupied_co[color]
+
+    def ply(self) -> int:
+        """ the number of half moves since the start of the game, like chess.Board.ply """
+        return 2 * (self.fullmove_number - 1) + (self.turn == chess.BLACK)
+
+    def king(self, color: bool) -> int:
+        return (self.pieces[chess.KING] & self.occupied_co[color]).bit_length() - 1
+
+    def is_check(self) -> bool:
+        return bool(self.attackers(not self.turn, self.king(self.turn)))
+
+    def pseudo_legal_moves(self, to_mask: int = BB_ALL) -> list[int]:
+        """ the moves of the side to move that may still leave its own king in check, in the order
+        chess.Board generates them, so that ties in the move ordering of the search are broken the
+        same way. Castling is only generated when the king does not start, pass or end on an attacked square.
+        Takes:
+            - to_mask: (int) only moves to these squares are generated
+        """
+        us: bool = self.turn
+        own: int = self.occupied_co[us]
+        enemy: int = self.occupied_co[not us] & to_mask
+        occupied: int = self.occupied
+        targets: int = ~own & to_mask
+        pieces: list[int] = self.pieces
+        squares: list[int] = self.squares
+        moves: list[int] = []
+        append = moves.append
+
+        # - pieces from the highest square down, then their targets from the highest square down
+        for origin in _scan(own & ~pieces[chess.PAWN]):
+            piece: int = squares[origin]
+            if piece == chess.KNIGHT:
+                attacks: int = _KNIGHT[origin]
+            elif piece == chess.BISHOP:
+                attacks = bishop_attacks(origin, occupied)
+            elif piece == chess.ROOK:
+                attacks = rook_attacks(origin, occupied)
+            elif piece == chess.QUEEN:
+                attacks = bishop_attacks(origin, occupied) | rook_attacks(origin, occupied)
+            else:
+                attacks = _KING[origin]
+            for to in _scan(attacks & targets):
+                append(origin | to << 6)
+
+        king: int = self.king(us)
+        rights: int = self.castling_rights & (_RANK_1 if us else _RANK_8)
+        if rights and not self.attackers(not us, king):
+            for rook, between, path in ((king + 3, 0b0110 << king, (king + 1, king + 2)),
+                                        (king - 4, 0b0111 << (king - 3), (king - 1, king - 2))):
+                if (rights & _BB[rook] and to_mask & _BB[path[1]] and not occupied & between
+                        and not any(self.attackers(not us, square) for square in path)):
+                    append(king | path[1] << 6)
+
+        pawns: int = pieces[chess.PAWN] & own
+        if not pawns:
+            return moves
+        last: int = _RANK_8 if us else _RANK_1
+        # - captures, the pawns that have one are found for all pawns at once by shifting the bitboard
+        if us:
+            single: int = (pawns << 8) & ~occupied & BB_ALL
+            double: int = ((single & _RANK_3) << 8) & ~occupied
+            capturers: int = ((((pawns & ~_FILE_A) << 7) & enemy) >> 7) | ((((pawns & ~_FILE_H) << 9) & enemy) >> 9)
+            push: int = 8
+        else:
+            single = (pawns >> 8) & ~occupied
+            double = ((single & _RANK_6) >> 8) & ~occupied
+            capturers = ((((pawns & ~_FILE_A) >> 9) & enemy) << 9) | ((((pawns & ~_FILE_H) >> 7) & enemy) << 7)
+            push = -8
+        attacks_of: list[int] = _PAWN[us]
+        for origin in _scan(capturers):
+            for to in _scan(attacks_of[origin] & enemy):
+                if _BB[to] & last:
+                    for promotion in _PROMOTIONS:
+                        append(origin | to << 6 | promotion << 12)
+                else:
+                    append(origin | to << 6)
+        for to in _scan(single & to_mask):
+            if _BB[to] & last:
+                for promotion in _PROMOTIONS:
+                    append((to - push) | to << 6 | promotion << 12)
+            else:
+                append((to - push) | to << 6)
+        for to in _scan(double & to_mask):
+            append((to - 2 * push) | to << 6)
+        ep: int | None = self.ep_square
+        if ep is not None and _BB[ep] & to_mask:
+            for origin in _scan(_PAWN[not us][ep] & pawns):
+                append(origin | ep << 6)
+        return moves
+
+    def legal_moves(self, to_mask: int = BB_ALL) -> list[int]:
+        """ the legal moves of the side to move, the game is over if there are none. In check the
+        king moves come first, like the evasions of chess.Board
+        Takes:
+            - to_mask: (int) only moves to these squares are generated
+        """
+        us: bool = self.turn
+        king: int = self.king(us)
+        checkers: int = self.attackers(not us, king)
+        pinned: int = self._pinned(us, king)
+        moves: list[int] = []
+        king_moves: list[int] = []
+        ep: int | None = self.ep_square
+        for move in self.pseudo_legal_moves(to_mask):
+            origin: int = move & 63
+            # - only these can put the own king in check, everything else is legal right away
+            if not (checkers or origin == king or pinned & _BB[origin] or (move >> 6 & 63) == ep):
+                moves.append(move)
+            elif origin == king and abs((move >> 6 & 63) - origin) == 2:
+                # - castling, the squares of the king were checked when it was generated
+                moves.append(move)
+            elif self._is_safe(move, king):
+                (king_moves if checkers and origin == king else moves).append(move)
+        return king_moves + moves if checkers else moves
+
+    def legal_captures(self) -> list[int]:
+        """ the legal captures of the side to move, en passant included, like chess.Board.generate_legal_captures """
+        enemy: int = self.occupied_co[not self.turn]
+        ep: int | None = self.ep_square
+        if ep is None:
+            return self.legal_moves(enemy)
+        # - pieces other than pawns only move to the empty en passant square
+        return [move for move in self.legal_moves(enemy | _BB[ep])
+                if (move >> 6 & 63) != ep or self.squares[move & 63] == chess.PAWN]
+
+    def _pinned(self, color: bool, king: int) -> int:
+        """ the pieces of color that are the only piece between their king and an enemy slider """
+        pieces: list[int] = self.pieces
+        queens: int = pieces[chess.QUEEN]
+        snipers: int = self.occupied_co[not color] & ((_ROOK_RAYS[king] & (pieces[chess.ROOK] | queens))
+                                                      | (_BISHOP_RAYS[king] & (pieces[chess.BISHOP] | queens)))
+        pinned: int = 0
+        for sniper in _scan(snipers):
+            between: int = _BETWEEN[king][sniper] & self.occupied
+            if between and not between & (between - 1):
+                pinned |= between & self.occupied_co[color]
+        return pinned
+
+    def _is_safe(self, move: int, king: int) -> bool:
+        """ whether the own king is not attacked after move """
+        origin, to = move & 63, move >> 6 & 63
+        captured: int = _BB[to]
+        if to == self.ep_square and self.squares[origin] == chess.PAWN:
+            captured |= _BB[to - 8 if self.turn else to + 8]
+        occupied: int = ((self.occupied & ~_BB[origin]) | _BB[to]) & ~(captured & ~_BB[to])
+        return not self.attackers(not self.turn, to if origin == king else king, occupied,
+                                  self.occupied_co[not self.turn] & ~captured)
+
+    def is_legal(self, move: int) -> bool:
+        return move in self.legal_moves()
+
+    def is_capture(self, move: int) -> bool:
+        to: int = move >> 6 & 63
+        return bool(self.squares[to]) or (to == self.ep_square and self.squares[move & 63] == chess.PAWN)
+
+    def gives_check(self, move: int) -> bool:
+        self.push(move)
+        try:
+            return self.is_check()
+        finally:
+            self.pop()
+
+    def piece_changes(self, move: int) -> tuple[list[Placement], list[Placement]]:
+        """ the pieces a move takes off the board and the ones it puts on, for the evaluations that are 
+        updated move by move instead of recomputed. Covers captures, en passant, promotions and castling.
+        Takes:
+            - move: (int) the code of the move before it is made, not a null move
+        """
+        us: bool = self.turn
+        origin, to = move & 63, move >> 6 & 63
+        piece_type: int = self.squares[origin]
+        removed: list[Placement] = [(us, piece_type, origin)]
+        added: list[Placement] = [(us, move >> 12 or piece_type, to)]
+        if piece_type == chess.KING and abs(to - origin) == 2:
+            rook_from, rook_to = CASTLING_ROOK_SQUARES[to]
+            removed.append((us, chess.ROOK, rook_from))
+            added.append((us, chess.ROOK, rook_to))
+            return removed, added
+        captured: int = self.squares[to]
+        if captured:
+            removed.append((not us, captured, to))
+        elif piece_type == chess.PAWN and to == self.ep_square:
+            # - en passant, the captured pawn is not on the square the pawn moves to
+            removed.append((not us, chess.PAWN, to - 8 if us else to + 8))
+        return removed, added
+
+    def push(self, move: int) -> None:
+        """ make a move given as a 16 bit code, 0 is a null move """
+        us: bool = self.turn
+        them: bool = not us
+        self._keys.append(self.key)
+        key: int = self.key ^ self._ep_key() ^ _CASTLING_KEYS[self.castling_rights] ^ _TURN_KEY
+        if not move:
+            self._stack.append((move, 0, 0, self.castling_rights, self.ep_square, self.halfmove_clock))
+            self.ep_square = None
+            self.halfmove_clock += 1
+            self.fullmove_number += not us
+            self.turn = them
+            self.key = key ^ _CASTLING_KEYS[self.castling_rights]
+            return None
+        origin, to, promotion = move & 63, move >> 6 & 63, move >> 12
+        squares: list[int] = self.squares
+        pieces: list[int] = self.pieces
+        occupied_co: list[int] = self.occupied_co
+        piece: int = squares[origin]
+        captured: int = squares[to]
+        ep_capture: int = 0
+        self._stack.append((move, captured, piece, self.castling_rights, self.ep_square, self.halfmove_clock))
+
+        pieces[piece] ^= _BB[origin]
+        occupied_co[us] ^= _BB[origin]
+        squares[origin] = 0
+        key ^= _PIECE_KEYS[us][piece][origin]
+        if captured:
+            pieces[captured] ^= _BB[to]
+            occupied_co[them] ^= _BB[to]
+            key ^= _PIECE_KEYS[them][captured][to]
+        elif piece == chess.PAWN and to == self.ep_square:
+            ep_capture = to - 8 if us else to + 8
+            pieces[chess.PAWN] ^= _BB[ep_capture]
+            occupied_co[them] ^= _BB[ep_capture]
+            squares[ep_capture] = 0
+            key ^= _PIECE_KEYS[them][chess.PAWN][ep_capture]
+        placed: int = promotion or piece
+        pieces[placed] |= _BB[to]
+        occupied_co[us] |= _BB[to]
+        squares[to] = placed
+        key ^= _PIECE_KEYS[us][placed][to]
+        if piece == chess.KING:
+            if abs(to - origin) == 2:
+                rook_from, rook_to = CASTLING_ROOK_SQUARES[to]
+                rook: int = _BB[rook_from] | _BB[rook_to]
+                pieces[chess.ROOK] ^= rook
+                occupied_co[us] ^= rook
+                squares[rook_from], squares[rook_to] = 0, chess.ROOK
+                key ^= _PIECE_KEYS[us][chess.ROOK][rook_from] ^ _PIECE_KEYS[us][chess.ROOK][rook_to]
+            self.castling_rights &= ~(_RANK_1 if us else _RANK_8)
+        self.castling_rights &= ~(_BB[origin] | _BB[to])
+        self.occupied = occupied_co[0] | occupied_co[1]
+
+        self.ep_square = (origin + to) // 2 if piece == chess.PAWN and abs(to - origin) == 16 else None
+        self.halfmove_clock = 0 if piece == chess.PAWN or captured or ep_capture else self.halfmove_clock + 1
+        self.fullmove_number += not us
+        self.turn = them
+        self.key = key ^ _CASTLING_KEYS[self.castling_rights] ^ self._ep_key()
+        return None
+
+    def pop(self) -> int:
+        """ take back the last move and return its code """
+        move, captured, piece, castling, ep_square, halfmove_clock = self._stack.pop()
+        self.key = self._keys.pop()
+        self.turn = us = not self.turn
+        self.fullmove_number -= not us
+        self.castling_rights, self.ep_square, self.halfmove_clock = castling, ep_square, halfmove_clock
+        if not move:
+            return move
+        them: bool = not us
+        origin, to = move & 63, move >> 6 & 63
+        squares: list[int] = self.squares
+        pieces: list[int] = self.pieces
+        occupied_co: list[int] = self.occupied_co
+        placed: int = squares[to]
+        pieces[placed] ^= _BB[to]
+        occupied_co[us] ^= _BB[to]
+        squares[to] = 0
+        pieces[piece] |= _BB[origin]
+        occupied_co[us] |= _BB[origin]
+        squares[origin] = piece
+        if captured:
+            pieces[captured] |= _BB[to]
+            occupied_co[them] |= _BB[to]
+            squares[to] = captured
+        elif piece == chess.PAWN and to == ep_square:
+            ep_capture: int = to - 8 if us else to + 8
+            pieces[chess.PAWN] |= _BB[ep_capture]
+            occupied_co[them] |= _BB[ep_capture]
+            squares[ep_capture] = chess.PAWN
+        if piece == chess.KING and abs(to - origin) == 2:
+            rook_from, rook_to = CASTLING_ROOK_SQUARES[to]
+            rook: int = _BB[rook_from] | _BB[rook_to]
+            pieces[chess.ROOK] ^= rook
+            occupied_co[us] ^= rook
+            squares[rook_from], squares[rook_to] = chess.ROOK, 0
+        self.occupied = occupied_co[0] | occupied_co[1]
+        return move
+
+    def push_move(self, move: chess.Move) -> None:
+        self.push(encode_move(move))
+        return None
+
+    def moves(self) -> list[chess.Move]:
+        """ the legal moves as chess.Move, for use at the root """
+        return [decode_move(move) for move in self.legal_moves()]  # type: ignore[misc]
+
+    def is_insufficient_material(self) -> bool:
+        """ neither side can mate, by the same rules as chess.Board.is_insufficient_material """
+        return all(self._insufficient(color) for color in (chess.WHITE, chess.BLACK))
+
+    def _insufficient(self, color: bool) -> bool:
+        pieces: list[int] = self.pieces
+        own: int = self.occupied_co[color]
+        if own & (pieces[chess.PAWN] | pieces[chess.ROOK] | pieces[chess.QUEEN]):
+            return False
+        if own & pieces[chess.KNIGHT]:
+            return (own.bit_count() <= 2
+                    and not self.occupied_co[not color] & ~pieces[chess.KING] & ~pieces[chess.QUEEN])
+        if own & pieces[chess.BISHOP]:
+            same_color: bool = not pieces[chess.BISHOP] & _DARK or not pieces[chess.BISHOP] & ~_DARK & BB_ALL
+            return same_color and not pieces[chess.PAWN] and not pieces[chess.KNIGHT]
+        return True
+
+    def is_repetition(self, count: int = 3) -> bool:
+        """ the position occurred count times, only positions since the last capture or pawn move can repeat """
+        keys: list[int] = self._keys[len(self._keys) - self.halfmove_clock:] if self.halfmove_clock else []
+        return keys.count(self.key) + 1 >= count
+
+    def outcome(self, moves: list[int] | None = None) -> chess.Outcome | None:
+        """ the outcome of the game like chess.Board.outcome, the legal moves are generated at
+        most once and can be passed in when the caller has them already """
+        if moves is None:
+            moves = self.legal_moves()
+        if not moves:
+            if self.is_check():
+                return chess.Outcome(chess.Termination.CHECKMATE, not self.turn)
+            return chess.Outcome(chess.Termination.STALEMATE, None)
+        if self.is_insufficient_material():
+            return chess.Outcome(chess.Termination.INSUFFICIENT_MATERIAL, None)
+        if self.halfmove_clock >= 150:
+            return chess.Outcome(chess.Termination.SEVENTYFIVE_MOVES, None)
+        if self.halfmove_clock >= 8 and self.is_repetition(5):
+            return chess.Outcome(chess.Termination.FIVEFOLD_REPETITION, None)
+        return None
+
+    def perft(self, depth: int) -> int:
+        """ number of leaf nodes of the legal move tree up to depth """
+        if depth <= 1:
+            return len(self.legal_moves()) if depth else 1
+        nodes: int = 0
+        for move in self.legal_moves():
+            self.push(move)
+            nodes += self.perft(depth - 1)
+            self.pop()
+        return nodes
@@ -0,0 +1,92 @@
+from dataclasses import dataclass, field
+import chess
+
+
+@dataclass
+class IterationStats:
+    """ counters of a single completed iteration of the iterative deepening, the score is seen
+    from the side of the searching player and seconds is the time of the iteration alone """
+    depth: int
+    score: float
+    move: chess.Move | None
+    nodes: int
+    qnodes: int
+    seconds: float
+    elapsed: float
+
+
+@dataclass
+class SearchStats:
+    """ counters of one search, collected by PlayerMiniMax when statistics are enabled.
+    Counters are cumulative over all iterations, the per iteration numbers are in iterations. """
+    nodes: int = 0
+    qnodes: int = 0
+    helper_nodes: int = 0
+    tt_probes: int = 0
+    tt_hits: int = 0
+    tt_cutoffs: int = 0
+    tb_hits: int = 0
+    expanded: int = 0
+    children: int = 0
+    cutoffs: int = 0
+    first_move_cutoffs: int = 0
+    null_tries: int = 0
+    null_cutoffs: int = 0
+    reductions: int = 0
+    researches: int = 0
+    aspiration_fails: int = 0
+    seconds: float = 0.
+    iterations: list[IterationStats] = field(default_factory=list)
+
+    @property
+    def depth(self) -> int:
+        """ depth of the last completed iteration """
+        return self.iterations[-1].depth if self.iterations else 0
+
+    @property
+    def nodes_per_second(self) -> float:
+        return (self.nodes + self.qnodes) / self.seconds if self.seconds else 0.
+
+    @property
+    def cutoff_rate(self) -> float:
+        """ fraction of the expanded nodes that failed high """
+        return self.cutoffs / self.expanded if self.expanded else 0.
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """ fraction of the cutoffs caused by the first move searched, a measure of the move ordering """
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.
+
+    @property
+    def mean_children(self) -> float:
+        """ mean number of moves searched per expanded node """
+        return self.children / self.expanded if self.expanded else 0.
+
+    @property
+    def branching_factor(self) -> float:
+        """ effective branching factor, the growth in nodes from the second to last to the last iteration """
+        if len(self.iterations) < 2 or not self.iterations[-2].nodes:
+            return 0.
+        return self.iterations[-1].nodes / self.iterations[-2].nodes
+
+    def as_dict(self) -> dict:
+        """ json serialisable summary of the search """
+        return {'depth': self.depth, 'nodes': self.nodes, 'qnodes': self.qnodes, 'helper_nodes': self.helper_nodes,
+                'seconds': self.seconds, 'nodes_per_second': self.nodes_per_second,
+                'cutoff_rate': self.cutoff_rate, 'first_move_cutoff_rate': self.first_move_cutoff_rate,
+                'tt_hit_rate': self.tt_hit_rate, 'tt_cutoffs': self.tt_cutoffs, 'tb_hits': self.tb_hits,
+                'mean_children': self.mean_children, 'branching_factor': self.branching_factor,
+                'null_tries': self.null_tries, 'null_cutoffs': self.null_cutoffs, 'reductions': self.reductions,
+                'researches': self.researches, 'aspiration_fails': self.aspiration_fails,
+                'iterations': [{'depth': it.depth, 'score': it.score, 'move': None if it.move is None else it.move.uci(),
+                                'nodes': it.nodes, 'qnodes': it.qnodes, 'seconds': it.seconds, 'elapsed': it.elapsed}
+                               for it in self.iterations]}
+
+    def summary(self) -> str:
+        return (f'depth {self.depth}, nodes {self.nodes} + {self.qnodes} q, {self.nodes_per_second:.0f} n/s, '
+                f'cutoffs {self.cutoff_rate:.1%} ({self.first_move_cutoff_rate:.1%} first move), '
+                f'tt hits {self.tt_hit_rate:.1%}, branching {self.branching_factor:.2f}')
@@ -0,0 +1,129 @@
+from .position import SearchPosition
+from collections import OrderedDict
+import logging
+import os
+import chess
+import chess.syzygy
+
+
+# - score of a tablebase win, above any material balance and below a mate on the board
+TB_WIN: float = 1000.
+
+
+class Tablebase:
+    """ syzygy endgame tablebases on local disk. Tables are opened on the first probe, and
+    the win / draw / loss results are kept in a bounded least recently used cache since the
+    search keeps reaching the same few endgame positions. """
+    def __init__(self, path: str, cache_size: int = 2 ** 16) -> None:
+        """ Initialiser of the Tablebase
+        Takes:
+            - path: (str) directory holding the .rtbw and .rtbz files, several directories can be
+                    separated by the path separator of the system
+            - cache_size: (int) the number of positions kept in the cache
+        """
+        self.path: str = path
+        self.cache_size: int = cache_size
+        self.logger = logging.getLogger('Tablebase')
+        self.max_pieces: int = 0
+        self._tables: chess.syzygy.Tablebase | None = None
+        self._cache: OrderedDict[int, int | None] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        return None
+
+    def open(self) -> chess.syzygy.Tablebase:
+        """ open the tables if they are not open yet, max_pieces is only known afterwards """
+        if self._tables is None:
+            self._tables = chess.syzygy.Tablebase()
+            for directory in self.path.split(os.pathsep):
+                try:
+                    self._tables.add_directory(directory)
+                except OSError as error:
+                    self.logger.warning(f'Could not open tablebase directory {directory}: {error}')
+            # - table names read like KQvK, one letter per piece and a separator
+            self.max_pieces = max((len(name) - 1 for name in self._tables.wdl), default=0)
+            self.logger.info(f'Opened {len(self._tables.wdl)} tables up to {self.max_pieces} pieces')
+        return self._tables
+
+    def covers(self, state: chess.Board | SearchPosition) -> bool:
+        """ whether the tables may hold the position, castling positions are never in them """
+        self.open()
+        return chess.popcount(state.occupied) <= self.max_pieces and not state.castling_rights
+
+    def probe_wdl(self, position: SearchPosition) -> int | None:
+        """ win / draw / loss of the position for the side to move: 2 win, 1 win spoiled by the
+        fifty move rule, 0 draw, -1 loss saved by the fifty move rule and -2 loss. None if the
+        position is not in the tables.
+        Takes:
+            - position: (SearchPosition) the position to look up, it is only turned into a
+                        chess.Board for the tables when it is not in the cache
+        """
+        if not self.covers(position):
+            return None
+        key: int = position.key
+        if key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        self.misses += 1
+        try:
+            wdl: int | None = self._tables.probe_wdl(position.to_board())  # type: ignore[union-attr]
+        except KeyError:
+            # - a table of this material is missing
+            wdl = None
+        self._cache[key] = wdl
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return wdl
+
+    def score(self, position: SearchPosition) -> float | None:
+        """ search score of the position for the side to move, None if it is not in the tables """
+        wdl: int | None = self.probe_wdl(position)
+        if wdl is None:
+            return None
+        # - wins that the fifty move rule turns into draws are only worth a little
+        return {2: TB_WIN, 1: 0.01, 0: 0., -1: -0.01, -2: -TB_WIN}[wdl]
+
+    def root_move(self, state: chess.Board) -> chess.Move | None:
+        """ the move keeping the best result that zeroes the fifty move counter the fastest when
+        winning and the slowest when losing, None if the position is not in the tables. A win that
+        the fifty move rule turns into a draw from the current halfmove clock counts as a draw.
+        Takes:
+            - state: (chess.Board) the position to find a move in
+        """
+        if not self.covers(state):
+            return None
+        best_move: chess.Move | None = None
+        best_rank: tuple[int, int] | None = None
+        tables: chess.syzygy.Tablebase = self.open()
+        for move in list(state.legal_moves):
+            zeroing: bool = state.is_zeroing(move)
+            state.push(move)
+            try:
+                if state.is_checkmate():
+                    rank: tuple[int, int] = (3, 0)
+                else:
+                    # - results after the move are seen from the opponent
+                    wdl: int = -tables.probe_wdl(state)
+                    # - the plies until the next zeroing move on the way to the result, counted
+                    #   together with the plies since the last one against the limit of 100
+                    plies: int = 1 if zeroing and wdl > 0 else 1 + abs(tables.probe_dtz(state))
+                    if not zeroing and abs(wdl) == 2 and state.halfmove_clock + plies - 1 > 100:
+                        wdl //= 2
+                    # - the winner wants to zero as soon as possible, the loser as late as possible
+                    rank = (wdl, -plies if wdl > 0 else plies if wdl < 0 else 0)
+            except KeyError:
+                # - a table this move leads to is missing, the other moves can still be ranked
+                continue
+            finally:
+                state.pop()
+            if best_rank is None or rank > best_rank:
+                best_move, best_rank = move, rank
+        return best_move
+
+    def close(self) -> None:
+        if self._tables is not None:
+            self._tables.close()
+            self._tables = None
+        self._cache.clear()
+        return None
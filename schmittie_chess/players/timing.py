@@ -0,0 +1,85 @@
+import time
+
+
+class SearchTimeout(Exception):
+    """ raised from within the search once the deadline of the current move has passed """
+
+
+class TimeManager:
+    """ derives the thinking time of a move from the game clock and keeps track of the deadline """
+    def __init__(self, moves_to_go: int = 40, min_moves_to_go: int = 15,
+                 overhead: int = 30, soft_fraction: float = 0.5) -> None:
+        """ Initialiser of the TimeManager
+        Takes:
+            - moves_to_go: (int) the number of moves the clock is expected to last from the start
+            - min_moves_to_go: (int) never plan with fewer remaining moves than this
+            - overhead: (int) time in milliseconds reserved per move for everything but the search
+            - soft_fraction: (float) fraction of the budget after which no new iteration is started
+        """
+        self.moves_to_go: int = moves_to_go
+        self.min_moves_to_go: int = min_moves_to_go
+        self.overhead: int = overhead
+        self.soft_fraction: float = soft_fraction
+        self.t0: float = time.perf_counter()
+        self.soft_deadline: float = float('inf')
+        self.deadline: float = float('inf')
+        return None
+
+    def budget(self, time_left: int, increment: int = 0, move_number: int = 1,
+               move_fraction: float = 0.2) -> int:
+        """ thinking time for a single move in milliseconds
+        Takes:
+            - time_left: (int) the remaining time on the clock in milliseconds
+            - increment: (int) the increment per move in milliseconds
+            - move_number: (int) the full move number of the game
+            - move_fraction: (float) the largest fraction of the remaining time to spend on a move
+        """
+        remaining: int = max(self.min_moves_to_go, self.moves_to_go - move_number)
+        planned: float = time_left / remaining + 0.75 * increment
+        planned = min(planned, time_left * move_fraction)
+        return max(int(planned) - self.overhead, 1)
+
+    def start(self, time_left: int, increment: int = 0, move_number: int = 1,
+              move_fraction: float = 0.2) -> int:
+        """ start the clock for a new move and set its deadlines, returns the budget in milliseconds """
+        budget: int = self.budget(time_left, increment, move_number, move_fraction)
+        self.t0 = time.perf_counter()
+        self.soft_deadline = self.t0 + self.soft_fraction * budget / 1000
+        self.deadline = self.t0 + budget / 1000
+        return budget
+
+    def start_fixed(self, budget: int) -> None:
+        """ start the clock with a fixed budget in milliseconds, iterations may start until the deadline """
+        self.t0 = time.perf_counter()
+        self.deadline = self.t0 + budget / 1000
+        self.soft_deadline = self.deadline
+        return None
+
+    def start_infinite(self) -> None:
+        """ start the clock without a deadline, the search runs until it is stopped """
+        self.t0 = time.perf_counter()
+        self.deadline = float('inf')
+        self.soft_deadline = float('inf')
+        return None
+
+    def scale(self, fraction: float) -> None:
+        """ shrink the deadlines of the current move to a fraction of its budget """
+        self.soft_deadline = self.t0 + (self.soft_deadline - self.t0) * fraction
+        self.deadline = self.t0 + (self.deadline - self.t0) * fraction
+        return None
+
+    def elapsed(self) -> float:
+        """ time since the start of the move in seconds """
+        return time.perf_counter() - self.t0
+
+    def remaining(self) -> int:
+        """ time until the hard deadline in milliseconds """
+        return max(int((self.deadline - time.perf_counter()) * 1000), 0)
+
+    def expired(self) -> bool:
+        """ whether the hard deadline has passed and the search has to stop """
+        return time.perf_counter() >= self.deadline
+
+    def can_start_iteration(self) -> bool:
+        """ whether there is enough time left to start searching one ply deeper """
+        return time.perf_counter() < self.soft_deadline
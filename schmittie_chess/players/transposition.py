@@ -0,0 +1,197 @@
+from typing import NamedTuple
+from multiprocessing import shared_memory
+import numpy as np
+import chess
+import chess.polyglot
+
+
+# - bound types of a stored score
+EXACT: int = 0
+LOWER: int = 1
+UPPER: int = 2
+
+# - one slot of the table, a bucket holds a depth-preferred and an always-replace slot
+_ENTRY = np.dtype([('key', np.uint64), ('score', np.float64), ('move', np.uint16),
+                   ('depth', np.int8), ('flag', np.uint8), ('age', np.uint8)])
+_SLOTS: int = 2
+
+
+class TTEntry(NamedTuple):
+    depth: int
+    score: float
+    flag: int
+    # - the best move as a code of encode_move, 0 for none
+    move: int
+
+
+def zobrist_key(state: chess.Board) -> int:
+    """ polyglot zobrist key of a board, used to index the transposition table """
+    return chess.polyglot.zobrist_hash(state)
+
+
+def encode_move(move: chess.Move | None) -> int:
+    """ pack a move into 16 bits: from square, to square and promotion piece type """
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code: int) -> chess.Move | None:
+    """ inverse of encode_move, 0 decodes to no move """
+    if not code:
+        return None
+    promotion: int = (code >> 12) & 7
+    return chess.Move(code & 63, (code >> 6) & 63, promotion or None)
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # - the creating process is responsible for unlinking, not every process attaching
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore[call-arg]
+    except TypeError:
+        # - python < 3.13 registers the block again, harmless for processes started by the
+        #   creator since they share its resource tracker
+        return shared_memory.SharedMemory(name=name)
+
+
+class TranspositionTable:
+    """ fixed size transposition table with two slots per bucket,
+    one that prefers deeper searches and one that is always replaced. """
+    def __init__(self, size_mb: float = 16., *, shared: bool = False, name: str | None = None) -> None:
+        """ Initialiser of the transposition table
+        Takes:
+            - size_mb: (float) the memory cap of the table in MiB
+            - shared: (bool) allocate the table in shared memory so other processes can attach to it
+            - name: (optional str) attach to the shared table with this name instead of allocating,
+                    size_mb has to match the size the table was created with
+        Entries of a shared table are written without locking. The key of an entry is stored xor-ed
+        with its data, an entry torn by two processes writing it at once no longer matches the key 
+        of any position it could be probed for. Key collisions remain possible, moves taken from 
+        the table are therefore checked for legality. Moves are stored and returned as the codes 
+        of encode_move.
+        """
+        self.size_mb: float = size_mb
+        self.n_buckets: int = max(1, int(size_mb * 2 ** 20) // (_SLOTS * _ENTRY.itemsize))
+        self._shm: shared_memory.SharedMemory | None = None
+        self._owner: bool = False
+        if name is not None:
+            self._shm = _attach(name)
+        elif shared:
+            self._shm = shared_memory.SharedMemory(create=True, size=self.n_buckets * _SLOTS * _ENTRY.itemsize)
+            self._owner = True
+        if self._shm is None:
+            self._table: np.ndarray = np.zeros((self.n_buckets, _SLOTS), dtype=_ENTRY)
+        else:
+            self._table = np.ndarray((self.n_buckets, _SLOTS), dtype=_ENTRY, buffer=self._shm.buf)
+            if self._owner:
+                self._table.fill(0)
+        self._age: int = 0
+        self._bind_fields()
+        return None
+
+    @property
+    def name(self) -> str | None:
+        """ name of the shared memory block, None if the table is private to this process """
+        return None if self._shm is None else self._shm.name
+
+    def close(self) -> None:
+        """ release the shared memory of the table, the creating process also unlinks it """
+        if self._shm is None:
+            return None
+        # - drop the views into the buffer before closing it
+        self._table = np.zeros((0, _SLOTS), dtype=_ENTRY)
+        self._bind_fields()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+        return None
+
+    def _bind_fields(self) -> None:
+        # - field views, indexing these is a lot cheaper than going through np.void records
+        self._key: np.ndarray = self._table['key']
+        self._score: np.ndarray = self._table['score']
+        self._score_bits: np.ndarray = self._score.view(np.uint64)
+        self._move: np.ndarray = self._table['move']
+        self._depth: np.ndarray = self._table['depth']
+        self._flag: np.ndarray = self._table['flag']
+        self._ages: np.ndarray = self._table['age']
+        return None
+
+    @property
+    def nbytes(self) -> int:
+        return self._table.nbytes
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._key))
+
+    def clear(self) -> None:
+        """ remove all entries from the table """
+        self._table.fill(0)
+        self._age = 0
+        return None
+
+    def new_search(self) -> None:
+        """ mark the start of a new search, entries of older searches become replaceable """
+        self._age = (self._age + 1) % 256
+        return None
+
+    @property
+    def age(self) -> int:
+        return self._age
+
+    @age.setter
+    def age(self, value: int) -> None:
+        # - processes sharing a table have to agree on the age of the current search
+        self._age = value % 256
+
+    def _data(self, bucket: int, slot: int) -> int:
+        """ the fields of a slot packed into 64 bits, the stored key is xor-ed with them """
+        return (self._score_bits.item(bucket, slot) ^ self._move.item(bucket, slot) << 32
+                ^ self._depth.item(bucket, slot) % 256 << 48 ^ self._flag.item(bucket, slot) << 56)
+
+    def _slot_key(self, bucket: int, slot: int) -> int:
+        """ the key of the position in a slot, 0 for an empty slot """
+        stored: int = self._key.item(bucket, slot)
+        return stored and stored ^ self._data(bucket, slot)
+
+    def probe(self, key: int) -> TTEntry | None:
+        """ look up a position in the table
+        Takes:
+            - key: (int) the zobrist key of the position
+        """
+        bucket: int = key % self.n_buckets
+        for slot in range(_SLOTS):
+            if self._slot_key(bucket, slot) == key:
+                return TTEntry(int(self._depth[bucket, slot]), float(self._score[bucket, slot]),
+                               int(self._flag[bucket, slot]), int(self._move[bucket, slot]))
+        return None
+
+    def store(self, key: int, depth: int, score: float, flag: int, move: int) -> None:
+        """ store a search result in the table
+        Takes:
+            - key: (int) the zobrist key of the position
+            - depth: (int) the remaining depth the position was searched to
+            - score: (float) the score found by the search
+            - flag: (int) the bound type of the score, one of EXACT, LOWER or UPPER
+            - move: (int) the code of the best move found in the position, 0 for none
+        """
+        bucket: int = key % self.n_buckets
+        # - the depth-preferred slot is taken if it is stale, shallower or the same position
+        same: bool = self._slot_key(bucket, 0) == key
+        if same or self._ages[bucket, 0] != self._age or self._depth[bucket, 0] <= depth:
+            slot: int = 0
+        else:
+            slot = 1
+            same = self._slot_key(bucket, 1) == key
+        if not move and same:
+            # - keep the move of an earlier search of the same position
+            move = int(self._move[bucket, slot])
+        self._score[bucket, slot] = score
+        self._move[bucket, slot] = move
+        self._depth[bucket, slot] = min(depth, 127)
+        self._flag[bucket, slot] = flag
+        self._ages[bucket, slot] = self._age
+        # - written last, and only valid together with the data written by the same store
+        self._key[bucket, slot] = key ^ self._data(bucket, slot)
+        return None
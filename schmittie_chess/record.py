@@ -0,0 +1,187 @@
+from .players.transposition import encode_move, decode_move
+from array import array
+from typing import Iterable, Iterator, Self
+import numpy as np
+import mmap
+import sys
+import chess
+import chess.pgn
+
+
+# - results stored in a byte of the index
+RESULTS: tuple[str, ...] = ('*', '1-0', '0-1', '1/2-1/2')
+
+_MAGIC: bytes = b'SCGR'
+_VERSION: int = 1
+# - per game the moves as little endian 16 bit codes and the fen, both located by their byte offset
+_INDEX = np.dtype([('moves', '<u8'), ('n_moves', '<u4'), ('fen', '<u8'), ('fen_length', '<u2'), ('result', 'u1')])
+# - the end of the file: offset of the index, number of games, version and magic
+_FOOTER = np.dtype([('index', '<u8'), ('n_games', '<u8'), ('version', '<u4'), ('magic', 'S4')])
+
+
+class GameRecord:
+    """ the moves of a game as 16 bit codes, see transposition.encode_move, with the position it
+    started from. Adding and taking back moves is O(1), SAN is only rendered on export. """
+    def __init__(self, fen: str = chess.STARTING_FEN, moves: Iterable[chess.Move] | array | None = None,
+                 result: str = '*') -> None:
+        """ Initialiser of the GameRecord
+        Takes:
+            - fen: (str) the starting position
+            - moves: (optional iterable) the moves of the game, or an array('H') of their codes
+            - result: (str) the result, one of RESULTS
+        """
+        self.fen: str = fen
+        self.result: str = result
+        if isinstance(moves, array):
+            self.moves: array = moves
+        else:
+            self.moves = array('H', [encode_move(move) for move in moves or []])
+        return None
+
+    @classmethod
+    def from_board(cls, state: chess.Board) -> Self:
+        """ record of the moves on the stack of a board """
+        return cls(state.root().fen(), state.move_stack, state.result())
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def __iter__(self) -> Iterator[chess.Move]:
+        return (decode_move(code) for code in self.moves)  # type: ignore[misc]
+
+    def __getitem__(self, ply: int) -> chess.Move:
+        return decode_move(self.moves[ply])  # type: ignore[return-value]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GameRecord):
+            return NotImplemented
+        return (self.fen, self.moves, self.result) == (other.fen, other.moves, other.result)
+
+    def push(self, move: chess.Move) -> None:
+        self.moves.append(encode_move(move))
+        return None
+
+    def pop(self) -> chess.Move:
+        """ take back the last move and return it """
+        return decode_move(self.moves.pop())  # type: ignore[return-value]
+
+    def clear(self, fen: str = chess.STARTING_FEN) -> None:
+        """ start a new game from fen """
+        self.fen, self.result = fen, '*'
+        del self.moves[:]
+        return None
+
+    def board(self) -> chess.Board:
+        """ the final position with the moves of the game on its stack """
+        state = chess.Board(self.fen)
+        for move in self:
+            state.push(move)
+        return state
+
+    def san(self) -> list[str]:
+        """ the moves in standard algebraic notation """
+        state = chess.Board(self.fen)
+        sans: list[str] = []
+        for move in self:
+            sans.append(state.san_and_push(move))
+        return sans
+
+    def pgn(self, result: str | None = None) -> str:
+        """ the move text with move numbers followed by the result
+        Takes:
+            - result: (optional str) the result to end with, defaults to the one of the record
+        """
+        text: str = chess.Board(self.fen).variation_san(list(self))
+        return f'{text} {self.result if result is None else result}'.strip()
+
+    def game(self) -> chess.pgn.Game:
+        """ the record as a pgn game, e.g. to add headers before writing it out """
+        game: chess.pgn.Game = chess.pgn.Game.from_board(self.board())
+        game.headers['Result'] = self.result
+        return game
+
+
+def save_records(path: str, records: Iterable[GameRecord]) -> int:
+    """ write game records to a file that RecordStore opens, the records are streamed to the file
+    and only the index is kept in memory. Returns the number of games written.
+    Takes:
+        - path: (str) the file to write
+        - records: (iterable) the games to store
+    """
+    index: list[tuple[int, int, int, int, int]] = []
+    with open(path, 'wb') as f:
+        f.write(_MAGIC)
+        for record in records:
+            fen: bytes = record.fen.encode()
+            fen_at: int = f.tell()
+            f.write(fen)
+            # - moves start at an even offset, so that they can be viewed as 16 bit integers in place
+            f.write(b'\0' * (f.tell() % 2))
+            moves: array = array('H', record.moves)
+            if sys.byteorder == 'big':
+                moves.byteswap()
+            index.append((f.tell(), len(moves), fen_at, len(fen), RESULTS.index(record.result)))
+            f.write(moves.tobytes())
+        f.write(b'\0' * (-f.tell() % 8))
+        index_at: int = f.tell()
+        f.write(np.array(index, dtype=_INDEX).tobytes())
+        f.write(np.array([(index_at, len(index), _VERSION, _MAGIC)], dtype=_FOOTER).tobytes())
+    return len(index)
+
+
+class RecordStore:
+    """ read only access to the games of a file written by save_records. The file is memory mapped,
+    opening it only reads the index and any game is looked up by its number without reading the others.
+    Everything handed out is copied from the map, so that closing the store always releases it. """
+    def __init__(self, path: str) -> None:
+        """ Initialiser of the RecordStore
+        Takes:
+            - path: (str) the file written by save_records
+        """
+        self.path: str = path
+        self._file = open(path, 'rb')
+        self._map: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < len(_MAGIC) + _FOOTER.itemsize or self._map[:len(_MAGIC)] != _MAGIC:
+            self.close()
+            raise ValueError(f'{path} is not a game record store')
+        footer: np.ndarray = np.frombuffer(self._map, _FOOTER, 1, len(self._map) - _FOOTER.itemsize).copy()
+        if footer['magic'][0] != _MAGIC or footer['version'][0] != _VERSION:
+            self.close()
+            raise ValueError(f'{path} is not a game record store of version {_VERSION}')
+        self.index: np.ndarray = np.frombuffer(self._map, _INDEX, int(footer['n_games'][0]), int(footer['index'][0])).copy()
+        return None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, number: int) -> GameRecord:
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError(f'Game {number} is not in the store of {len(self)} games')
+        entry = self.index[number]
+        fen: str = self._map[int(entry['fen']):int(entry['fen']) + int(entry['fen_length'])].decode()
+        moves = array('H', self._map[int(entry['moves']):int(entry['moves']) + 2 * int(entry['n_moves'])])
+        if sys.byteorder == 'big':
+            moves.byteswap()
+        return GameRecord(fen, moves, RESULTS[entry['result']])
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        return (self[number] for number in range(len(self)))
+
+    def moves(self, number: int) -> np.ndarray:
+        """ the move codes of a game as an array, without decoding them """
+        entry = self.index[number]
+        return np.frombuffer(self._map, '<u2', int(entry['n_moves']), int(entry['moves'])).copy()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+        return None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+        return None
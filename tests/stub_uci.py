@@ -0,0 +1,35 @@
+""" minimal uci engine for the tests, plays the first legal move. Every command it gets is
+appended to the file given as the first argument, so the tests can check what was sent. """
+import sys
+import time
+import chess
+
+
+def main(log_path: str) -> None:
+    board: chess.Board = chess.Board()
+    with open(log_path, 'a') as log:
+        for line in sys.stdin:
+            line = line.strip()
+            log.write(line + '\n')
+            log.flush()
+            if line == 'uci':
+                print('id name stub\nuciok', flush=True)
+            elif line == 'isready':
+                print('readyok', flush=True)
+            elif line.startswith('position'):
+                parts: list[str] = line.split()
+                board = chess.Board() if parts[1] == 'startpos' else chess.Board(' '.join(parts[2:8]))
+                if 'moves' in parts:
+                    for move in parts[parts.index('moves') + 1:]:
+                        board.push_uci(move)
+            elif line.startswith('go'):
+                # - long enough for searches of other threads to overlap
+                time.sleep(0.05)
+                move: chess.Move = next(iter(board.legal_moves))
+                print(f'info depth 1 score cp 0\nbestmove {move.uci()}', flush=True)
+            elif line == 'quit':
+                break
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -0,0 +1,43 @@
+from schmittie_chess.analysis import scan_games, analyse_pgn, read_columns
+import pathlib
+import io
+import chess.pgn
+
+
+def write_pgn(path: pathlib.Path, n_games: int) -> bytes:
+    """ a pgn file with multi byte characters and windows line endings, where text mode positions
+    and byte offsets part ways """
+    games: list[str] = []
+    for index in range(n_games):
+        games.append(f'[Event "Schnellschach Göttingen {index}"]\r\n[White "Jürgen"]\r\n[Black "Zoë"]\r\n'
+                     f'[Result "*"]\r\n\r\n1. e4 e5 2. Nf3 {{ Königsspringer }} Nc6 *\r\n\r\n')
+    data: bytes = ''.join(games).encode('utf-8')
+    path.write_bytes(data)
+    return data
+
+
+def test_scan_games_gives_byte_offsets(tmp_path):
+    path: pathlib.Path = tmp_path / 'games.pgn'
+    data: bytes = write_pgn(path, 4)
+    with open(path, 'rb') as handle:
+        offsets = [(start, end) for start, end, _ in scan_games(handle)]
+    assert len(offsets) == 4 and offsets[0][0] == 0 and offsets[-1][1] == len(data)
+    for index, (start, end) in enumerate(offsets):
+        game = chess.pgn.read_game(io.StringIO(data[start:end].decode('utf-8')))
+        assert game.headers['Event'] == f'Schnellschach Göttingen {index}'
+        assert len(list(game.mainline_moves())) == 4
+
+
+def test_analysis_resumes_at_the_checkpoint(tmp_path):
+    path: pathlib.Path = tmp_path / 'games.pgn'
+    write_pgn(path, 3)
+    output: str = str(tmp_path / 'columns')
+    assert analyse_pgn(str(path), output, depth=1, movetime=None, max_games=2) == 2
+    assert analyse_pgn(str(path), output, depth=1, movetime=None) == 1
+    with open(path, 'rb') as handle:
+        starts: list[int] = [start for start, _, _ in scan_games(handle)]
+    columns = read_columns(output)
+    # - five positions per game, every game once
+    assert sorted(set(columns['offset'].tolist())) == starts
+    assert len(columns['offset']) == 15
+    assert not (tmp_path / 'columns.offset.tmp').exists()
@@ -0,0 +1,21 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from schmittie_chess.board.board import Board
+import chess
+import pygame
+
+
+def test_legal_moves_follow_the_position_not_the_ply():
+    pygame.init()
+    board = Board()
+    # - same ply, different position: moves taken back on the chess.Board and others played
+    for move in ('e2e4', 'e7e5'):
+        board.board.push_uci(move)
+    assert chess.Move.from_uci('f1c4') in board.legal_moves_from(chess.F1)
+    board.board.pop()
+    board.board.pop()
+    for move in ('d2d4', 'd7d5'):
+        board.board.push_uci(move)
+    assert board.legal_moves_from(chess.F1) == []
+    assert chess.Move.from_uci('c1f4') in board.legal_moves_from(chess.C1)
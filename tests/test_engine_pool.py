@@ -0,0 +1,67 @@
+from schmittie_chess.players.engine_pool import EnginePool
+from concurrent.futures import ThreadPoolExecutor
+from chess import engine
+import pathlib
+import sys
+import chess
+
+
+STUB: str = str(pathlib.Path(__file__).with_name('stub_uci.py'))
+
+
+def test_concurrent_searches_share_the_engines(tmp_path):
+    log: pathlib.Path = tmp_path / 'uci.log'
+    pool = EnginePool([sys.executable, STUB, str(log)], size=2)
+    games: list[object] = [object() for _ in range(6)]
+    try:
+        with ThreadPoolExecutor(6) as executor:
+            results = list(executor.map(lambda game: pool.play(chess.Board(), engine.Limit(time=0.1), game=game), games))
+        assert all(result.move in chess.Board().legal_moves for result in results)
+        assert pool.spawned == 2
+        # - every search is a game of its own and starts with ucinewgame
+        assert log.read_text().splitlines().count('ucinewgame') == 6
+    finally:
+        pool.close()
+    assert log.read_text().splitlines().count('quit') == 2
+
+
+def test_continued_game_reuses_the_engine(tmp_path):
+    log: pathlib.Path = tmp_path / 'uci.log'
+    pool = EnginePool([sys.executable, STUB, str(log)])
+    board = chess.Board()
+    try:
+        for _ in range(3):
+            board.push(pool.play(board, engine.Limit(time=0.1)).move)
+        assert pool.spawned == 1
+        assert log.read_text().splitlines().count('ucinewgame') == 1
+    finally:
+        pool.close()
+    assert pool._engines == []
+
+
+def test_shutdown_survives_an_engine_that_is_gone(tmp_path, monkeypatch):
+    log: pathlib.Path = tmp_path / 'uci.log'
+    pool = EnginePool([sys.executable, STUB, str(log)], size=2)
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(lambda game: pool.play(chess.Board(), engine.Limit(time=0.1), game=game), [1, 2]))
+    gone = pool._engines[0]
+
+    # - the process of one engine exited on its own, quitting and killing it both fail
+    async def quit() -> None:
+        raise engine.EngineTerminatedError('engine process died unexpectedly')
+
+    def kill() -> None:
+        raise ProcessLookupError
+
+    monkeypatch.setattr(gone, 'quit', quit)
+    monkeypatch.setattr(gone.transport, 'kill', kill)
+    pool.close()
+    assert pool._engines == []
+    # - the other engine was still told to quit
+    assert log.read_text().splitlines().count('quit') == 1
+    try:
+        pool.play(chess.Board(), engine.Limit(time=0.1))
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError('a closed pool must not play')
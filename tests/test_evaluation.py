@@ -0,0 +1,50 @@
+from schmittie_chess.players.evaluation import Evaluator, SIMPLE_PST, pack_boards, pack_positions, position_bitboards
+from schmittie_chess.players.position import SearchPosition
+from schmittie_chess.players.transposition import encode_move
+import numpy as np
+import random
+import chess
+
+
+def random_boards(n: int, seed: int = 7) -> list[chess.Board]:
+    rng = random.Random(seed)
+    boards: list[chess.Board] = []
+    for _ in range(n):
+        board = chess.Board()
+        for _ in range(rng.randrange(1, 80)):
+            moves: list[chess.Move] = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board)
+    return boards
+
+
+def test_batch_scores_match_evaluate():
+    boards: list[chess.Board] = random_boards(50)
+    positions: list[SearchPosition] = [SearchPosition.from_board(board) for board in boards]
+    packed: np.ndarray = pack_positions(positions)
+    assert (packed == pack_boards(boards)).all()
+    assert (pack_positions([position_bitboards(position) for position in positions]) == packed).all()
+    for evaluator in (Evaluator(), Evaluator(pst=SIMPLE_PST)):
+        expected: list[float] = []
+        for position in positions:
+            evaluator.reset(position)
+            expected.append(evaluator.evaluate(chess.BLACK))
+        assert np.allclose(evaluator.evaluate_batch(packed, chess.BLACK), expected)
+
+
+def test_incremental_updates_match_reset():
+    evaluator, reference = Evaluator(pst=SIMPLE_PST), Evaluator(pst=SIMPLE_PST)
+    for board in random_boards(20, seed=11):
+        position: SearchPosition = SearchPosition.from_board(board.root())
+        evaluator.reset(position)
+        for move in board.move_stack:
+            evaluator.push(position, encode_move(move))
+            reference.reset(position)
+            assert abs(evaluator.evaluate() - reference.evaluate()) < 1e-9
+        while board.move_stack:
+            board.pop()
+            evaluator.pop(position)
+        reference.reset(position)
+        assert abs(evaluator.evaluate() - reference.evaluate()) < 1e-9
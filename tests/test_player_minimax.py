@@ -0,0 +1,30 @@
+from schmittie_chess.players.player_minimax import PlayerMiniMax
+from schmittie_chess.players.transposition import EXACT, encode_move
+import chess
+import chess.polyglot
+
+
+def test_stop_while_idle_does_not_cut_later_searches():
+    player = PlayerMiniMax(stats=True)
+    player.stop()
+    player.choose_move(chess.Board(), 60000, depth=3)
+    assert player.last_stats.iterations[-1].depth == 3
+
+
+def test_prepared_stop_is_used_up_by_one_search():
+    player = PlayerMiniMax(stats=True)
+    player.prepare_search()
+    player.stop()
+    assert player.choose_move(chess.Board(), 60000, depth=3) in chess.Board().legal_moves
+    assert len(player.last_stats.iterations) <= 1
+    player.choose_move(chess.Board(), 60000, depth=3)
+    assert player.last_stats.iterations[-1].depth == 3
+
+
+def test_root_ignores_illegal_move_from_the_table():
+    board = chess.Board()
+    player = PlayerMiniMax()
+    # - a collision or torn entry with a deep exact score and a move that is not legal here
+    player.tt.store(chess.polyglot.zobrist_hash(board), 30, 5., EXACT, encode_move(chess.Move.from_uci('e2e5')))
+    player.keep_tt = True
+    assert player.choose_move(board, 60000, depth=2) in board.legal_moves
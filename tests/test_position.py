@@ -0,0 +1,69 @@
+from schmittie_chess.benchmark import PERFT_SUITE, perft
+from schmittie_chess.players.position import SearchPosition
+from schmittie_chess.players.transposition import encode_move
+import pytest
+import random
+import chess
+import chess.polyglot
+
+
+@pytest.mark.parametrize('name', PERFT_SUITE)
+def test_perft(name):
+    fen, counts = PERFT_SUITE[name]
+    position: SearchPosition = SearchPosition.from_fen(fen)
+    assert position.perft(3) == perft(chess.Board(fen), 3) == counts[2]
+
+
+@pytest.mark.parametrize('name', PERFT_SUITE)
+def test_moves_match_python_chess(name):
+    # - the same moves in the same order two plies deep, captures included
+    def walk(board: chess.Board, position: SearchPosition, depth: int) -> None:
+        moves: list[int] = position.legal_moves()
+        assert moves == [encode_move(move) for move in board.legal_moves]
+        assert position.legal_captures() == [encode_move(move) for move in board.generate_legal_captures()]
+        if not depth:
+            return None
+        for move in board.legal_moves:
+            board.push(move)
+            position.push(encode_move(move))
+            walk(board, position, depth - 1)
+            position.pop()
+            board.pop()
+        return None
+
+    fen: str = PERFT_SUITE[name][0]
+    walk(chess.Board(fen), SearchPosition.from_fen(fen), 2)
+
+
+def test_push_pop_round_trip():
+    rng = random.Random(5)
+    for _ in range(30):
+        board = chess.Board()
+        position: SearchPosition = SearchPosition.from_board(board)
+        for _ in range(rng.randrange(20, 160)):
+            moves: list[chess.Move] = list(board.legal_moves)
+            if not moves:
+                break
+            move: chess.Move = rng.choice(moves)
+            board.push(move)
+            position.push(encode_move(move))
+            assert position.key == chess.polyglot.zobrist_hash(board) == position.zobrist()
+        # - a board with the same moves on its stack gives the same position
+        assert SearchPosition.from_board(board).key == position.key
+        assert position.fen() == board.fen()
+        while board.move_stack:
+            assert position.pop() == encode_move(board.pop())
+            assert position.key == chess.polyglot.zobrist_hash(board)
+            assert position.fen() == board.fen()
+
+
+def test_null_move_round_trip():
+    board = chess.Board('rnbqkbnr/ppp1pppp/8/8/3pP3/5N2/PPPP1PPP/RNBQKB1R b KQkq e3 0 3')
+    position: SearchPosition = SearchPosition.from_board(board)
+    key: int = position.key
+    position.push(0)
+    board.push(chess.Move.null())
+    assert position.key == chess.polyglot.zobrist_hash(board)
+    position.pop()
+    board.pop()
+    assert position.key == key and position.fen() == board.fen()
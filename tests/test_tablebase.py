@@ -0,0 +1,55 @@
+from schmittie_chess.players.tablebase import Tablebase
+import chess
+
+
+class FakeTables:
+    """ stands in for chess.syzygy.Tablebase, results are looked up by the last move played """
+    def __init__(self, results: dict[str, tuple[int, int] | None]) -> None:
+        self.results: dict[str, tuple[int, int] | None] = results
+
+    def _result(self, state: chess.Board) -> tuple[int, int]:
+        result: tuple[int, int] | None = self.results.get(state.peek().uci(), (0, 0))
+        if result is None:
+            raise KeyError('missing table')
+        return result
+
+    def probe_wdl(self, state: chess.Board) -> int:
+        return self._result(state)[0]
+
+    def probe_dtz(self, state: chess.Board) -> int:
+        return self._result(state)[1]
+
+
+def fake_tablebase(results: dict[str, tuple[int, int] | None]) -> Tablebase:
+    tablebase = Tablebase('')
+    tablebase._tables = FakeTables(results)  # type: ignore[assignment]
+    tablebase.max_pieces = 5
+    return tablebase
+
+
+# - the white king can take the knight on d2, results are seen from black after the move
+FEN: str = '8/8/8/4k3/8/8/3n4/R3K3 w - - {} 1'
+
+
+def test_winning_capture_beats_smaller_dtz():
+    tablebase = fake_tablebase({'e1d2': (-2, -10), 'a1a5': (-2, -3)})
+    assert tablebase.root_move(chess.Board(FEN.format(0))) == chess.Move.from_uci('e1d2')
+
+
+def test_win_spoiled_by_the_fifty_move_rule_is_not_a_win():
+    # - a real win against a win that the fifty move rule already spoils in the tables
+    tablebase = fake_tablebase({'a1a8': (-2, -30), 'a1a5': (-1, -5)})
+    assert tablebase.root_move(chess.Board(FEN.format(0))) == chess.Move.from_uci('a1a8')
+    # - with 80 plies on the counter the long win zeroes too late and is spoiled as well
+    assert tablebase.root_move(chess.Board(FEN.format(80))) == chess.Move.from_uci('a1a5')
+
+
+def test_losing_side_delays_zeroing():
+    tablebase = fake_tablebase({move.uci(): (2, 2) for move in chess.Board(FEN.format(0)).legal_moves}
+                               | {'a1a5': (2, 9)})
+    assert tablebase.root_move(chess.Board(FEN.format(0))) == chess.Move.from_uci('a1a5')
+
+
+def test_moves_that_can_not_be_probed_are_skipped():
+    tablebase = fake_tablebase({'e1d2': None, 'a1a5': (-2, -3)})
+    assert tablebase.root_move(chess.Board(FEN.format(0))) == chess.Move.from_uci('a1a5')
@@ -0,0 +1,24 @@
+from schmittie_chess.players.transposition import TranspositionTable, EXACT, LOWER
+
+
+def test_store_and_probe():
+    table = TranspositionTable(1)
+    table.store(12345, 3, 1.5, LOWER, 777)
+    entry = table.probe(12345)
+    assert (entry.depth, entry.score, entry.flag, entry.move) == (3, 1.5, LOWER, 777)
+    # - a store without a move keeps the move of the same position
+    table.store(12345, 4, -2., EXACT, 0)
+    assert table.probe(12345).move == 777
+    assert table.probe(54321) is None
+
+
+def test_torn_entry_is_rejected():
+    table = TranspositionTable(1, shared=True)
+    try:
+        table.store(12345, 3, 1.5, EXACT, 777)
+        # - a second process wrote only part of its entry into the same slot
+        bucket: int = 12345 % table.n_buckets
+        table._score[bucket, 0] = -9.
+        assert table.probe(12345) is None
+    finally:
+        table.close()